@@ -0,0 +1,141 @@
+# app/analytics.py
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+
+from .findings import findings_list_query
+
+# Breakdowns are computed in Mongo: each endpoint runs one aggregate() whose
+# $facet stage produces every breakdown from a single pass over the matching
+# findings. The $match is built by the list routes' own findings_list_query, so
+# a breakdown always agrees with the list it summarizes.
+
+# Trend bucket -> $dateToString format of the bucket key
+TREND_BUCKETS = {
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+}
+MAX_TREND_DAYS = 366
+
+
+def findings_match(user_id: str, **filters: Optional[str]) -> Dict[str, Any]:
+    # Comma separated values match any of them, as on the list routes
+    return findings_list_query(user_id, filters)
+
+
+def _group_by(key: Any, **accumulators: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$group": {"_id": key, **accumulators}},
+        {"$sort": {"_id": 1}},
+    ]
+
+
+def _savings_group(key: Any) -> List[Dict[str, Any]]:
+    return _group_by(key, count={"$sum": 1}, estimated_savings={"$sum": "$estimated_savings"})
+
+
+def cost_breakdown_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$project": {
+            "platform": 1, "region": 1, "impact": 1, "resource_type": 1, "estimated_savings": 1
+        }},
+        {"$facet": {
+            "totals": _savings_group(None),
+            "by_platform": _savings_group("$platform"),
+            "by_region": _savings_group({"platform": "$platform", "region": "$region"}),
+            "by_impact": _savings_group("$impact"),
+            "by_resource_type": _savings_group("$resource_type"),
+        }},
+    ]
+
+
+def security_breakdown_pipeline(match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": match},
+        {"$project": {"severity": 1, "platform": 1, "resource_type": 1, "compliance": 1}},
+        {"$facet": {
+            "totals": _group_by(None, count={"$sum": 1}),
+            "by_severity": _group_by("$severity", count={"$sum": 1}),
+            "by_platform": _group_by("$platform", count={"$sum": 1}),
+            "by_resource_type": _group_by("$resource_type", count={"$sum": 1}),
+            # An issue counts once for every framework it maps to
+            "by_severity_compliance": [
+                {"$unwind": "$compliance"},
+                *_group_by({"severity": "$severity", "framework": "$compliance"}, count={"$sum": 1}),
+            ],
+        }},
+    ]
+
+
+def trend_pipeline(
+    match: Dict[str, Any],
+    bucket: str,
+    since: datetime,
+    savings: bool = False
+) -> List[Dict[str, Any]]:
+    """Findings first seen per time bucket since `since`.
+
+    Findings written before first_seen existed fall back to created_at.
+    """
+    accumulators: Dict[str, Any] = {"count": {"$sum": 1}}
+    if savings:
+        accumulators["estimated_savings"] = {"$sum": "$estimated_savings"}
+    return [
+        {"$match": match},
+        {"$project": {
+            "seen": {"$ifNull": ["$first_seen", "$created_at"]},
+            "estimated_savings": 1,
+        }},
+        {"$match": {"seen": {"$gte": since}}},
+        {"$project": {
+            "bucket": {"$dateToString": {"format": TREND_BUCKETS[bucket], "date": "$seen"}},
+            "estimated_savings": 1,
+        }},
+        *_group_by("$bucket", **accumulators),
+    ]
+
+
+def trend_since(days: int) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def _rows(groups: List[Dict[str, Any]], key_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    rows = []
+    for group in groups:
+        key = group.pop("_id")
+        row = dict(key) if isinstance(key, dict) else {key_name: key}
+        row.update(group)
+        if "estimated_savings" in row:
+            row["estimated_savings"] = round(row["estimated_savings"] or 0, 2)
+        rows.append(row)
+    return rows
+
+
+async def cost_breakdown(db, match: Dict[str, Any]) -> Dict[str, Any]:
+    facets = await db.cost_recommendations.aggregate(cost_breakdown_pipeline(match)).next()
+    totals = facets["totals"][0] if facets["totals"] else {"count": 0, "estimated_savings": 0}
+    return {
+        "recommendations": totals["count"],
+        "estimated_savings": round(totals["estimated_savings"] or 0, 2),
+        "by_platform": _rows(facets["by_platform"], "platform"),
+        "by_region": _rows(facets["by_region"]),
+        "by_impact": _rows(facets["by_impact"], "impact"),
+        "by_resource_type": _rows(facets["by_resource_type"], "resource_type"),
+    }
+
+
+async def security_breakdown(db, match: Dict[str, Any]) -> Dict[str, Any]:
+    facets = await db.security_issues.aggregate(security_breakdown_pipeline(match)).next()
+    return {
+        "total": facets["totals"][0]["count"] if facets["totals"] else 0,
+        "by_severity": _rows(facets["by_severity"], "severity"),
+        "by_platform": _rows(facets["by_platform"], "platform"),
+        "by_resource_type": _rows(facets["by_resource_type"], "resource_type"),
+        "by_severity_compliance": _rows(facets["by_severity_compliance"]),
+    }
+
+
+async def findings_trend(collection, match: Dict[str, Any], bucket: str, days: int, savings: bool = False):
+    pipeline = trend_pipeline(match, bucket, trend_since(days), savings)
+    return _rows([doc async for doc in collection.aggregate(pipeline)], "bucket")
@@ -0,0 +1,7 @@
+# app/auth_cache.py
+from .lru import LRUCache
+
+
+class UserCache(LRUCache):
+    """Authenticated users keyed by JWT subject, so get_current_user skips the
+    users lookup for `ttl` seconds. Holds at most `maxsize` users."""
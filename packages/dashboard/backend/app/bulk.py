@@ -0,0 +1,141 @@
+# app/bulk.py
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import os
+
+from .summary import security_deltas, cost_deltas, apply_summary_delta
+from .caching import bump_data_version
+from .findings import findings_list_query
+from .serialization import as_object_id
+
+# Bulk actions over findings. Requests matching up to BULK_SYNC_LIMIT findings are
+# applied inline and report a result per finding; larger ones are queued on
+# scan_jobs and applied by the worker in batches of BULK_BATCH_SIZE.
+BULK_SYNC_LIMIT = int(os.getenv("BULK_SYNC_LIMIT", "1000"))
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", "10000"))
+
+# action -> how it is applied: target collection and status, the filters it
+# accepts, and what the dashboard summary needs to reverse an open finding
+BULK_ACTIONS: Dict[str, Dict[str, Any]] = {
+    "remediate": {
+        "collection": "security_issues",
+        "status": "remediated",
+        "filters": ("severity", "platform"),
+        "projection": {"severity": 1},
+        "deltas": security_deltas,
+    },
+    "apply": {
+        "collection": "cost_recommendations",
+        "status": "applied",
+        "filters": ("impact", "platform"),
+        "projection": {"estimated_savings": 1},
+        "deltas": cost_deltas,
+    },
+}
+
+
+def bulk_query(
+    action: str,
+    user_id: str,
+    ids: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Findings the action selects: the given ids, or everything matching the filters.
+
+    Filters take a single value or a comma separated list, as on the list
+    endpoints. Findings already in the action's target status are never selected.
+    """
+    spec = BULK_ACTIONS[action]
+    query = findings_list_query(user_id, {field: (filters or {}).get(field) for field in spec["filters"]})
+    query["status"] = {"$ne": spec["status"]}
+    if ids is not None:
+        query["_id"] = {"$in": [as_object_id(i) for i in ids]}
+    return query
+
+
+async def count_bulk_targets(db, action: str, query: Dict[str, Any]) -> int:
+    return await db[BULK_ACTIONS[action]["collection"]].count_documents(query)
+
+
+async def apply_bulk_action(
+    db,
+    action: str,
+    user_id: str,
+    query: Dict[str, Any],
+    on_batch: Optional[Callable[[int], Awaitable[None]]] = None
+) -> List[str]:
+    """Set the action's status on every finding matching `query`.
+
+    Each batch is read once (for ids and summary fields) and written with a
+    single update_many. Returns the ids of the findings this call updated.
+    """
+    spec = BULK_ACTIONS[action]
+    collection = db[spec["collection"]]
+    fields = {"_id": 1, "status": 1}
+    fields.update(spec["projection"])
+
+    updated: List[str] = []
+    batch: List[Dict[str, Any]] = []
+
+    async def flush():
+        now = datetime.utcnow()
+        ids = [doc["_id"] for doc in batch]
+        result = await collection.update_many(
+            {"_id": {"$in": ids}, "status": {"$ne": spec["status"]}},
+            {"$set": {"status": spec["status"], "updated_at": now}}
+        )
+        changed = list(batch)
+        if result.modified_count < len(batch):
+            # Some findings reached the status after they were read (a concurrent
+            # request); re-read which ones carry this write's timestamp
+            cursor = collection.find(
+                {"_id": {"$in": ids}, "status": spec["status"], "updated_at": now},
+                projection={"_id": 1}
+            )
+            ours = {doc["_id"] async for doc in cursor}
+            changed = [doc for doc in batch if doc["_id"] in ours]
+        # Only open findings are counted in the dashboard summary
+        opened = [doc for doc in changed if doc.get("status") == "open"]
+        if opened:
+            await apply_summary_delta(db, user_id, spec["deltas"](opened, sign=-1))
+        if changed:
+            await bump_data_version(db, user_id)
+        updated.extend(str(doc["_id"]) for doc in changed)
+        if on_batch:
+            await on_batch(len(changed))
+        batch.clear()
+
+    async for document in collection.find(query, projection=fields).batch_size(BULK_BATCH_SIZE):
+        batch.append(document)
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return updated
+
+
+def bulk_item_results(ids: List[str], updated: List[str], already: List[str]) -> List[Dict[str, str]]:
+    """Per-id outcome of a bulk request made with an explicit id list."""
+    updated_ids = set(updated)
+    already_ids = set(already)
+    results = []
+    for finding_id in ids:
+        if finding_id in updated_ids:
+            result = "updated"
+        elif finding_id in already_ids:
+            result = "unchanged"
+        else:
+            result = "not_found"
+        results.append({"id": finding_id, "result": result})
+    return results
+
+
+async def already_in_status(db, action: str, user_id: str, ids: List[str]) -> List[str]:
+    """Ids from `ids` that already carry the action's target status."""
+    spec = BULK_ACTIONS[action]
+    cursor = db[spec["collection"]].find(
+        {"user_id": user_id, "_id": {"$in": [as_object_id(i) for i in ids]}, "status": spec["status"]},
+        projection={"_id": 1}
+    )
+    return [str(doc["_id"]) async for doc in cursor]
@@ -0,0 +1,168 @@
+# app/caching.py
+from typing import Any, Dict, Mapping, Optional, Tuple
+from datetime import datetime
+import hashlib
+import os
+
+from .lru import LRUCache
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # only needed when RESPONSE_CACHE_URL points at Redis
+    aioredis = None
+
+# Conditional GET for read endpoints. Every tenant has a data version in
+# `tenant_versions` that writers bump whenever resources, findings or the
+# summary change. ETags are derived from that version plus the request, so a
+# read only costs a point lookup of the version document until the data
+# actually changes. Cached bodies are keyed by the ETag and never need
+# invalidating: a bump simply moves readers on to a new key.
+
+# "" disables the response cache, "memory" keeps it in-process, redis://... shares it
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+# Larger bodies are streamed to the client without being cached
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(1024 * 1024)))
+
+# GET routes whose responses depend only on the tenant's data (and the request itself)
+CACHEABLE_PATHS = ("/api/resources", "/api/security/issues", "/api/costs/recommendations", "/api/dashboard/summary")
+CACHEABLE_PREFIXES = ("/api/analytics/",)
+
+# Query parameters that pull in data a TTL index deletes. Those deletions never bump
+# the data version, so such responses are neither cached nor answered with 304.
+UNVERSIONED_PARAMS = ("include_stale",)
+_TRUE_VALUES = ("1", "true", "t", "yes", "y", "on")
+
+
+def is_cacheable(path: str, params: Optional[Mapping[str, str]] = None) -> bool:
+    if not (path in CACHEABLE_PATHS or path.startswith(CACHEABLE_PREFIXES)):
+        return False
+    return not any((params or {}).get(name, "").lower() in _TRUE_VALUES for name in UNVERSIONED_PARAMS)
+
+
+async def get_data_version(db, user_id: str) -> int:
+    version, _ = await get_data_version_state(db, user_id)
+    return version
+
+
+async def get_data_version_state(db, user_id: str) -> Tuple[int, Optional[datetime]]:
+    """The tenant's data version and when it was last bumped."""
+    doc = await db.tenant_versions.find_one({"_id": user_id}, projection={"version": 1, "updated_at": 1})
+    if not doc:
+        return 0, None
+    return doc["version"], doc.get("updated_at")
+
+
+async def bump_data_version(db, user_id: str) -> None:
+    await db.tenant_versions.update_one(
+        {"_id": user_id},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def make_etag(user_id: str, version: int, url: str, accept: Optional[str]) -> str:
+    """Strong ETag for one representation of the tenant's data at `version`.
+
+    The UTC date is included because trend windows are relative to today.
+    """
+    digest = hashlib.sha1(
+        f"{user_id}|{url}|{accept or ''}|{datetime.utcnow():%Y-%m-%d}".encode()
+    ).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    """Response body cache keyed by ETag. Implementations must be safe to share across requests."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, body: bytes) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """Per-process LRU/TTL cache; each API worker keeps its own copy."""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self._entries = LRUCache(maxsize, ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, body: bytes) -> None:
+        self._entries.set(key, body)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class RedisResponseCache(ResponseCache):
+    """Shared cache on any server speaking the Redis protocol (Redis, Valkey, ElastiCache)."""
+
+    def __init__(self, url: str, ttl: int = RESPONSE_CACHE_TTL_SECONDS, prefix: str = "spearpoint:response:"):
+        if aioredis is None:
+            raise RuntimeError("RESPONSE_CACHE_URL points at Redis but the redis package is not installed")
+        self._client = aioredis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        # A cache outage must never fail the request; fall through to Mongo instead
+        try:
+            body = await self._client.get(self.prefix + key)
+        except Exception:
+            self.errors += 1
+            return None
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return body
+
+    async def set(self, key: str, body: bytes) -> None:
+        try:
+            await self._client.set(self.prefix + key, body, ex=self.ttl)
+        except Exception:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def build_response_cache(url: str = RESPONSE_CACHE_URL) -> Optional[ResponseCache]:
+    if not url:
+        return None
+    if url == "memory":
+        return MemoryResponseCache()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisResponseCache(url)
+    raise ValueError(f"Unsupported RESPONSE_CACHE_URL: {url}")
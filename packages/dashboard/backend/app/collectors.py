@@ -0,0 +1,289 @@
+# app/collectors.py
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+from datetime import datetime
+import abc
+import asyncio
+import os
+import time
+import uuid
+
+Resource = Dict[str, Any]
+
+# Global cap on concurrently running (collector, region, account) tasks per scan
+COLLECTOR_CONCURRENCY = int(os.getenv("COLLECTOR_CONCURRENCY", "8"))
+
+# Per-provider API budget in page requests per second for each account, e.g.
+# "aws=20,azure=10,gcp=10". The budget is shared by every scan in one process, not
+# across processes: N API/worker processes may together use up to N times the rate.
+COLLECTOR_RATE_LIMITS = os.getenv("COLLECTOR_RATE_LIMITS", "aws=20,azure=10,gcp=10")
+
+# When set, scans use FakeCollector with this many synthetic resources per connected platform
+SCAN_FAKE_RESOURCES = int(os.getenv("SCAN_FAKE_RESOURCES", "0"))
+
+COLLECTOR_PAGE_SIZE = int(os.getenv("COLLECTOR_PAGE_SIZE", "500"))
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        platform, _, rate = item.partition("=")
+        limits[platform.strip()] = float(rate)
+    return limits
+
+
+class Collector(abc.ABC):
+    """Collects one service's resources on one platform.
+
+    Subclasses implement pages(), an async generator yielding lists of resource
+    documents for a single region and account. Regions and accounts come from the
+    stored credentials ("regions"/"accounts", comma separated) and default to
+    `default_regions` and a single implicit account.
+    """
+
+    platform = ""
+    service = ""
+    default_regions: List[str] = []
+
+    def __init__(self, user_id: str, credentials: Dict[str, Any], page_size: int = COLLECTOR_PAGE_SIZE):
+        self.user_id = user_id
+        self.credentials = credentials or {}
+        self.page_size = page_size
+
+    def _split(self, key: str) -> List[str]:
+        value = self.credentials.get(key) or ""
+        return [item.strip() for item in value.split(",") if item.strip()]
+
+    def regions(self) -> List[str]:
+        return self._split("regions") or list(self.default_regions)
+
+    def accounts(self) -> List[Optional[str]]:
+        return self._split("accounts") or [None]
+
+    @abc.abstractmethod
+    def pages(self, region: str, account: Optional[str]) -> AsyncIterator[List[Resource]]:
+        """Async generator yielding pages of resource documents for one region and account."""
+
+    def _stable_suffix(self, *scope: Optional[str]) -> str:
+        # Demo resource ids are stable per user and scope (region, account) so repeated
+        # scans update the same inventory and each region or account gets its own resources
+        name = ":".join(["spearpoint", self.user_id, *(part or "" for part in scope)])
+        return uuid.uuid5(uuid.NAMESPACE_URL, name).hex[:8]
+
+
+class AwsEc2Collector(Collector):
+    platform = "aws"
+    service = "ec2"
+    default_regions = ["us-east-1"]
+
+    async def pages(self, region, account):
+        # Sample resource for demo purposes
+        yield [{
+            "id": f"i-{self._stable_suffix(region, account)}",
+            "name": "example-ec2-instance",
+            "type": "t3.micro",
+            "platform": "aws",
+            "region": region,
+            "tags": {"Environment": "development", "Owner": "spearpoint"},
+            "created_at": datetime.utcnow()
+        }]
+
+
+class AzureVmCollector(Collector):
+    platform = "azure"
+    service = "compute"
+    default_regions = ["eastus"]
+
+    async def pages(self, region, account):
+        # Sample resource for demo purposes
+        yield [{
+            "id": f"/subscriptions/{account or 'example'}/resourceGroups/example-rg/providers/Microsoft.Compute/virtualMachines/{self._stable_suffix(region, account)}",
+            "name": "example-azure-vm",
+            "type": "Standard_B2s",
+            "platform": "azure",
+            "region": region,
+            "resource_group": "example-rg",
+            "tags": {"environment": "development", "owner": "spearpoint"},
+            "created_at": datetime.utcnow()
+        }]
+
+
+class GcpComputeCollector(Collector):
+    platform = "gcp"
+    service = "compute"
+    default_regions = ["us-central1"]
+
+    async def pages(self, region, account):
+        # Sample resource for demo purposes
+        zone = f"{region}-a"
+        yield [{
+            "id": f"projects/{account or 'example'}/zones/{zone}/instances/{self._stable_suffix()}",
+            "name": "example-gcp-instance",
+            "type": "e2-medium",
+            "platform": "gcp",
+            "zone": zone,
+            "tags": {"environment": "development", "owner": "spearpoint"},
+            "created_at": datetime.utcnow()
+        }]
+
+
+class FakeCollector(Collector):
+    """Generates `count` synthetic resources per region for offline throughput testing."""
+
+    service = "fake"
+    TYPES = {
+        "aws": ["t3.micro", "t3.small", "t3.medium"],
+        "azure": ["Standard_B1s", "Standard_B2s"],
+        "gcp": ["e2-small", "e2-medium"],
+    }
+    REGIONS = {"aws": ["us-east-1"], "azure": ["eastus"], "gcp": ["us-central1"]}
+
+    def __init__(self, user_id, credentials, platform: str, count: int, page_size: int = COLLECTOR_PAGE_SIZE):
+        super().__init__(user_id, credentials, page_size)
+        self.platform = platform
+        self.count = count
+        self.default_regions = self.REGIONS[platform]
+
+    async def pages(self, region, account):
+        types = self.TYPES[self.platform]
+        now = datetime.utcnow()
+        for start in range(0, self.count, self.page_size):
+            page = []
+            for i in range(start, min(start + self.page_size, self.count)):
+                page.append({
+                    "id": f"{self.platform}-{region}-{account or 'default'}-{i:08d}",
+                    "name": f"fake-{self.platform}-{i}",
+                    "type": types[i % len(types)],
+                    "platform": self.platform,
+                    "region": region,
+                    "tags": {"environment": "benchmark", "index": str(i)},
+                    "created_at": now
+                })
+            yield page
+            # Let other collectors and the consumer run between pages
+            await asyncio.sleep(0)
+
+
+# Collector classes per platform; each one is run for every region and account
+COLLECTORS: Dict[str, List[Type[Collector]]] = {
+    "aws": [AwsEc2Collector],
+    "azure": [AzureVmCollector],
+    "gcp": [GcpComputeCollector],
+}
+
+CollectionTask = Tuple[Collector, str, Optional[str]]
+
+
+def build_collection_tasks(user_id: str, credentials: Dict[str, Any]) -> List[CollectionTask]:
+    """Expand a user's stored credentials into (collector, region, account) tasks."""
+    tasks = []
+    for platform, collector_classes in COLLECTORS.items():
+        platform_credentials = credentials.get(platform)
+        if not platform_credentials:
+            continue
+        if SCAN_FAKE_RESOURCES:
+            collectors = [FakeCollector(user_id, platform_credentials, platform, SCAN_FAKE_RESOURCES)]
+        else:
+            collectors = [cls(user_id, platform_credentials) for cls in collector_classes]
+        for collector in collectors:
+            for region in collector.regions():
+                for account in collector.accounts():
+                    tasks.append((collector, region, account))
+    return tasks
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Token buckets per (platform, account), shared by every scheduler in this process
+_buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+
+
+def rate_limiter(platform: str, account: Optional[str], rate: float) -> TokenBucket:
+    """The process-wide bucket for one provider account; concurrent scans draw from the same budget."""
+    bucket = _buckets.get((platform, account))
+    if bucket is None or bucket.rate != rate:
+        bucket = _buckets[(platform, account)] = TokenBucket(rate)
+    return bucket
+
+
+class CollectorScheduler:
+    """Runs collection tasks concurrently and merges their pages into one stream.
+
+    At most `concurrency` tasks run at once, every page request first takes a
+    token from its provider's bucket, and a bounded queue applies backpressure
+    so collectors never run far ahead of the consumer. Buckets are per provider
+    account and shared with other schedulers in the process. Failed tasks are
+    recorded in `failures` rather than aborting the other collectors.
+    """
+
+    def __init__(self, concurrency: int = COLLECTOR_CONCURRENCY, rate_limits: Optional[Dict[str, float]] = None):
+        self.concurrency = concurrency
+        limits = parse_rate_limits(COLLECTOR_RATE_LIMITS) if rate_limits is None else rate_limits
+        self.rate_limits = {platform: rate for platform, rate in limits.items() if rate > 0}
+        self.failures: List[Dict[str, Any]] = []
+
+    async def run(self, tasks: List[CollectionTask]) -> AsyncIterator[List[Resource]]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def produce(collector: Collector, region: str, account: Optional[str]):
+            async with semaphore:
+                rate = self.rate_limits.get(collector.platform)
+                bucket = rate_limiter(collector.platform, account, rate) if rate else None
+                pages = collector.pages(region, account).__aiter__()
+                try:
+                    while True:
+                        if bucket:
+                            await bucket.acquire()
+                        try:
+                            page = await pages.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        if page:
+                            await queue.put(page)
+                except Exception as e:
+                    self.failures.append({
+                        "platform": collector.platform,
+                        "service": collector.service,
+                        "region": region,
+                        "account": account,
+                        "error": str(e)
+                    })
+
+        async def close_when_done(producers):
+            await asyncio.gather(*producers)
+            await queue.put(None)
+
+        producers = [asyncio.create_task(produce(*task)) for task in tasks]
+        closer = asyncio.create_task(close_when_done(producers))
+        try:
+            while True:
+                page = await queue.get()
+                if page is None:
+                    break
+                yield page
+        finally:
+            for task in producers + [closer]:
+                task.cancel()
+
+    def failed_platforms(self) -> List[str]:
+        return sorted({failure["platform"] for failure in self.failures})
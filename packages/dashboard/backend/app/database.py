@@ -0,0 +1,87 @@
+# app/database.py
+from typing import Any, Dict, List, Optional
+import os
+import motor.motor_asyncio
+from pymongo import read_preferences
+
+from .metrics import MongoCommandMetrics, MongoPoolMetrics
+
+# MongoDB/DocumentDB Configuration
+MONGODB_URL = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "spearpoint")
+
+# Connection pool, per process: every gunicorn worker and scan worker has its own,
+# so the cluster sees up to workers x MONGO_MAX_POOL_SIZE connections per container.
+# Unset values keep the driver defaults.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = os.getenv("MONGO_MAX_IDLE_TIME_MS")
+# How long a request waits for a free connection before failing with 503
+MONGO_WAIT_QUEUE_TIMEOUT_MS = os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS")
+# Comma separated wire compressors in order of preference, e.g. "zstd,snappy".
+# zstd needs the zstandard package and snappy python-snappy; the server picks
+# the first one it also supports.
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+
+# Read preference for read-heavy endpoints (lists, summary, analytics); writes and
+# everything else always use the primary. A secondary is only chosen while it
+# lags the primary by at most MONGO_READ_MAX_STALENESS_SECONDS (90 is the
+# smallest value drivers accept; -1 removes the bound).
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+MONGO_READ_MAX_STALENESS_SECONDS = int(os.getenv("MONGO_READ_MAX_STALENESS_SECONDS", "90"))
+
+READ_PREFERENCES = {
+    "primary": read_preferences.Primary,
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+
+def pool_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+    }
+    if MONGO_MAX_IDLE_TIME_MS:
+        options["maxIdleTimeMS"] = int(MONGO_MAX_IDLE_TIME_MS)
+    if MONGO_WAIT_QUEUE_TIMEOUT_MS:
+        options["waitQueueTimeoutMS"] = int(MONGO_WAIT_QUEUE_TIMEOUT_MS)
+    compressors: List[str] = [c.strip() for c in MONGO_COMPRESSORS.split(",") if c.strip()]
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def read_preference(name: Optional[str] = None):
+    """The read preference used for read-heavy endpoints."""
+    name = name or MONGO_READ_PREFERENCE
+    if name not in READ_PREFERENCES:
+        raise ValueError(f"Unknown MONGO_READ_PREFERENCE {name!r}; expected one of {', '.join(READ_PREFERENCES)}")
+    if name == "primary":
+        return read_preferences.Primary()
+    return READ_PREFERENCES[name](max_staleness=MONGO_READ_MAX_STALENESS_SECONDS)
+
+
+def create_client(url: str = MONGODB_URL) -> motor.motor_asyncio.AsyncIOMotorClient:
+    """Build a Motor client. pymongo starts monitor threads as soon as a client
+    exists, so call this in each process after fork, never at import time."""
+    options = pool_options()
+    options["event_listeners"] = [MongoCommandMetrics(), MongoPoolMetrics()]
+    # Configure SSL for DocumentDB if needed
+    if "docdb" in url or os.getenv("USE_SSL", "false").lower() == "true":
+        return motor.motor_asyncio.AsyncIOMotorClient(
+            url,
+            tls=True,
+            tlsAllowInvalidCertificates=True,
+            retryWrites=False,  # DocumentDB doesn't support retryWrites
+            serverSelectionTimeoutMS=5000,
+            **options
+        )
+    return motor.motor_asyncio.AsyncIOMotorClient(url, **options)
+
+
+def read_database(db):
+    """`db` with the configured read preference; shares the client's connection pools."""
+    return db.with_options(read_preference=read_preference())
@@ -0,0 +1,157 @@
+# app/export.py
+from typing import Any, AsyncIterator, Dict, List, Optional, Union, get_args, get_origin
+from datetime import datetime
+import asyncio
+import csv
+import io
+import json
+import os
+
+from .serialization import RowSerializer, model_field_types
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for format=parquet
+    pa = None
+    pq = None
+
+# Bulk exports for offline analysis. Rows are read from a Motor cursor in
+# batches of EXPORT_BATCH_SIZE and written out as they arrive, CSV as text
+# chunks and Parquet as one row group per batch, so memory use depends on the
+# batch size rather than the size of the export.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    # Starlette appends "; charset=utf-8" to text/* media types
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    return value
+
+
+async def _batches(cursor, serializer: RowSerializer) -> AsyncIterator[List[Dict[str, Any]]]:
+    batch: List[Dict[str, Any]] = []
+    async for document in cursor.batch_size(EXPORT_BATCH_SIZE):
+        batch.append(serializer.row(document))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def stream_csv(cursor, serializer: RowSerializer) -> AsyncIterator[bytes]:
+    """CSV with a header row, one chunk per batch. Lists are joined with ";" and mappings written as JSON."""
+    columns = serializer.fields
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for batch in _batches(cursor, serializer):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(column)) for column in columns] for row in batch)
+        yield buffer.getvalue().encode()
+
+
+def _arrow_type(annotation: Any):
+    """Arrow type for a model field annotation; mappings and anything unknown become JSON strings."""
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if get_origin(annotation) in (list, List):
+        (item,) = get_args(annotation) or (str,)
+        return pa.list_(_arrow_type(item))
+    return {
+        str: pa.string(),
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        datetime: pa.timestamp("ms"),
+    }.get(annotation, pa.string())
+
+
+def arrow_schema(serializer: RowSerializer):
+    field_types = model_field_types(serializer.model)
+    return pa.schema([
+        # id is always the stringified _id
+        (name, pa.string() if name == "id" else _arrow_type(field_types[name]))
+        for name in serializer.fields
+    ])
+
+
+def _arrow_value(value: Any, arrow_type) -> Any:
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type) and not isinstance(value, str):
+        return json.dumps(value, default=str)
+    return value
+
+
+class _Chunks:
+    """Write-only file object that hands over whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_row_group(writer, schema, batch: List[Dict[str, Any]]) -> None:
+    columns = {
+        field.name: pa.array([_arrow_value(row.get(field.name), field.type) for row in batch], type=field.type)
+        for field in schema
+    }
+    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+async def stream_parquet(cursor, serializer: RowSerializer) -> AsyncIterator[bytes]:
+    """Parquet file written one row group per batch; the footer goes out with the last chunk."""
+    schema = arrow_schema(serializer)
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for batch in _batches(cursor, serializer):
+            # Column conversion and compression are CPU bound; keep them off the event loop
+            await asyncio.to_thread(_write_row_group, writer, schema, batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(export_format: str, cursor, serializer: RowSerializer) -> AsyncIterator[bytes]:
+    if export_format == "parquet":
+        return stream_parquet(cursor, serializer)
+    return stream_csv(cursor, serializer)
+
+
+def export_filename(collection: str, export_format: str, now: Optional[datetime] = None) -> str:
+    return f"{collection}-{(now or datetime.utcnow()):%Y%m%d-%H%M%S}.{export_format}"
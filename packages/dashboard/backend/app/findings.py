@@ -0,0 +1,267 @@
+# app/findings.py
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+import hashlib
+import os
+
+from .rules import SEVERITY_RANKS, security_rules
+from .pricing import get_pricing_catalog
+from .summary import merge_deltas
+from .caching import bump_data_version
+
+# Security and cost scans are incremental: each (user, kind) keeps a high-water
+# mark in `scan_watermarks`, and the next scan only evaluates resources whose
+# changed_at is later. Findings for every other resource carry forward as they
+# are. The mark also records the rule/catalog version it was computed with, so
+# changing the rules forces a full re-evaluation.
+#
+# The mark is the newest changed_at a scan actually evaluated, less
+# WATERMARK_SAFETY_SECONDS: a resource scan running at the same time may commit
+# a changed_at slightly older than one already read, and that change must still
+# be newer than the mark. changed_at is stamped per batch just before its write,
+# so the margin covers one bulk write plus clock skew between hosts.
+WATERMARK_SAFETY_SECONDS = int(os.getenv("WATERMARK_SAFETY_SECONDS", "300"))
+
+
+async def get_watermark(db, user_id: str, kind: str, version: str) -> Optional[datetime]:
+    """Return the mark to scan from, or None when a full scan is needed."""
+    mark = await db.scan_watermarks.find_one({"_id": f"{user_id}:{kind}"})
+    if mark is None or mark.get("version") != version:
+        return None
+    return mark.get("last_run_at")
+
+
+async def set_watermark(db, user_id: str, kind: str, version: str, mark: datetime) -> None:
+    await db.scan_watermarks.update_one(
+        {"_id": f"{user_id}:{kind}"},
+        {"$set": {"user_id": user_id, "kind": kind, "version": version, "last_run_at": mark}},
+        upsert=True
+    )
+
+
+class ChangeTracker:
+    """Wraps a resource cursor and remembers the newest changed_at that came off it."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.newest: Optional[datetime] = None
+
+    async def __aiter__(self):
+        async for resource in self.cursor:
+            changed_at = resource.get("changed_at")
+            if changed_at is not None and (self.newest is None or changed_at > self.newest):
+                self.newest = changed_at
+            yield resource
+
+    def watermark(self, started_at: datetime) -> datetime:
+        """The next scan's mark; the scan's start time stands in when nothing evaluated had a changed_at."""
+        return (self.newest or started_at) - timedelta(seconds=WATERMARK_SAFETY_SECONDS)
+
+
+def changed_resources_query(user_id: str, watermark: Optional[datetime]) -> Dict[str, Any]:
+    """Resources to evaluate: everything on a full scan, otherwise only what changed since the mark.
+
+    Stale resources are included so their earlier findings can be resolved.
+    """
+    query: Dict[str, Any] = {"user_id": user_id}
+    if watermark is not None:
+        query["changed_at"] = {"$gt": watermark}
+    return query
+
+
+# Finding states owned by the scanner; anything else (remediated, applied) was set
+# by a user and is left alone when a rescan reports the finding again
+AUTO_STATES = ("open", "resolved")
+
+
+async def sync_findings(
+    collection,
+    user_id: str,
+    scan_id: str,
+    resource_ids: List[str],
+    findings: List[Dict[str, Any]],
+    delta_fn: Callable[..., Dict[str, float]],
+    projection: Dict[str, int]
+) -> Dict[str, float]:
+    """Upsert a batch of findings keyed on (user_id, resource_id, rule_id).
+
+    `resource_ids` are the resources evaluated in this batch. Reported findings
+    are opened (or reopened if previously auto-resolved) and get last_seen
+    bumped; open findings of those resources that were not reported are
+    resolved. Returns the dashboard summary deltas, computed with `delta_fn`
+    over the open findings before and after the batch.
+    """
+    if not resource_ids:
+        return {}
+    now = datetime.utcnow()
+
+    fields = {"_id": 1, "resource_id": 1, "rule_id": 1, "status": 1}
+    fields.update(projection)
+    existing = {
+        (doc["resource_id"], doc.get("rule_id")): doc
+        async for doc in collection.find(
+            {"user_id": user_id, "resource_id": {"$in": resource_ids}},
+            projection=fields
+        )
+    }
+    open_before = [doc for doc in existing.values() if doc.get("status") == "open"]
+    open_after = []
+
+    operations = []
+    reported = set()
+    for finding in findings:
+        key = (finding["resource_id"], finding["rule_id"])
+        reported.add(key)
+        previous = existing.get(key)
+
+        update_fields = {k: v for k, v in finding.items() if k not in ("status", "created_at")}
+        update_fields.update({"last_seen": now, "last_seen_scan": scan_id, "updated_at": now})
+        update: Dict[str, Any] = {"$set": update_fields, "$setOnInsert": {"first_seen": now, "created_at": now}}
+        if previous is None or previous.get("status") in AUTO_STATES:
+            update_fields["status"] = "open"
+            update["$unset"] = {"resolved_at": ""}
+            open_after.append(finding)
+
+        operations.append(UpdateOne(
+            {"user_id": user_id, "resource_id": finding["resource_id"], "rule_id": finding["rule_id"]},
+            update,
+            upsert=True
+        ))
+
+    # Open findings the rescan no longer reports are resolved automatically
+    for key, doc in existing.items():
+        if key not in reported and doc.get("status") == "open":
+            operations.append(UpdateOne(
+                {"_id": doc["_id"], "status": "open"},
+                {"$set": {"status": "resolved", "resolved_at": now, "updated_at": now}}
+            ))
+
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+    return merge_deltas(delta_fn(open_after), delta_fn(open_before, sign=-1))
+
+
+# List queries. Filters take a single value or a comma separated list
+# (severity=high,critical), ranges are inclusive and `search` runs against the
+# collection's text index. Sort names map to the stored field they order by.
+SECURITY_ISSUE_SORTS = {"created_at": "created_at", "severity": "severity_rank"}
+COST_RECOMMENDATION_SORTS = {"created_at": "created_at", "estimated_savings": "estimated_savings"}
+
+
+def match_values(value: str) -> Any:
+    """`a` matches a, `a,b` matches either."""
+    values = [v.strip() for v in value.split(",") if v.strip()]
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+def findings_list_query(
+    user_id: str,
+    filters: Optional[Dict[str, Optional[str]]] = None,
+    ranges: Optional[Dict[str, Tuple[Any, Any]]] = None,
+    search: Optional[str] = None
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"user_id": user_id}
+    for field, value in (filters or {}).items():
+        if value:
+            query[field] = match_values(value)
+    for field, (low, high) in (ranges or {}).items():
+        bounds = {}
+        if low is not None:
+            bounds["$gte"] = low
+        if high is not None:
+            bounds["$lte"] = high
+        if bounds:
+            query[field] = bounds
+    if search:
+        query["$text"] = {"$search": search}
+    return query
+
+
+async def backfill_severity_rank(collection) -> int:
+    """Set severity_rank on security issues stored before it existed. Returns the number updated."""
+    updated = 0
+    for severity, rank in SEVERITY_RANKS.items():
+        result = await collection.update_many(
+            {"severity": severity, "severity_rank": {"$exists": False}},
+            {"$set": {"severity_rank": rank}}
+        )
+        updated += result.modified_count
+    return updated
+
+
+# Findings written before they were keyed on (user_id, resource_id, rule_id) may
+# lack rule_id and repeat once per scan. Both are fixed before the unique index
+# on that key is built (see indexes.ensure_indexes).
+
+def _legacy_matchers(collection_name: str) -> Tuple[List[Tuple[Dict[str, Any], str]], str]:
+    """(filter, rule_id) pairs recognising legacy findings of each known rule, and the text field to fall back on."""
+    if collection_name == "security_issues":
+        return [
+            ({"platform": rule.platform, "issue": rule.issue}, rule.rule_id)
+            for rule in security_rules.all_rules()
+        ], "issue"
+    return [
+        ({
+            "platform": rule["platform"],
+            "current_configuration": rule["current_configuration"],
+            "recommended_configuration": rule["recommended_configuration"],
+        }, rule["id"])
+        for rule in get_pricing_catalog().rules
+    ], "current_configuration"
+
+
+async def backfill_rule_ids(collection) -> int:
+    """Give findings without a rule_id the id of the rule that produced them. Returns the number updated.
+
+    Findings no current rule matches get a stable "legacy-<hash>" id derived from their text.
+    """
+    matchers, text_field = _legacy_matchers(collection.name)
+    missing = {"rule_id": None}
+    updated = 0
+    for match, rule_id in matchers:
+        result = await collection.update_many({**missing, **match}, {"$set": {"rule_id": rule_id}})
+        updated += result.modified_count
+    for text in await collection.distinct(text_field, missing):
+        rule_id = "legacy-" + hashlib.sha1(str(text).encode()).hexdigest()[:12]
+        result = await collection.update_many({**missing, text_field: text}, {"$set": {"rule_id": rule_id}})
+        updated += result.modified_count
+    result = await collection.update_many(missing, {"$set": {"rule_id": "legacy"}})
+    return updated + result.modified_count
+
+
+async def dedupe_findings(db, collection) -> int:
+    """Keep only the newest finding per (user_id, resource_id, rule_id). Returns the number deleted.
+
+    Summaries of the affected tenants are dropped so the next read rebuilds them
+    from the remaining findings.
+    """
+    duplicates = collection.aggregate([
+        {"$sort": {"last_seen": -1, "created_at": -1, "_id": -1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "resource_id": "$resource_id", "rule_id": "$rule_id"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+
+    deleted = 0
+    tenants = set()
+    async for group in duplicates:
+        result = await collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+        deleted += result.deleted_count
+        tenants.add(group["_id"]["user_id"])
+    for user_id in tenants:
+        await db.dashboard_summaries.delete_one({"_id": user_id})
+        await bump_data_version(db, user_id)
+    return deleted
+
+
+async def prepare_findings_key(db, collection) -> Dict[str, int]:
+    """Backfill rule ids and drop duplicates so the unique (user_id, resource_id, rule_id) index can be built."""
+    return {
+        "rule_ids_backfilled": await backfill_rule_ids(collection),
+        "duplicates_removed": await dedupe_findings(db, collection),
+    }
@@ -0,0 +1,95 @@
+# app/hashing.py
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHasher:
+    """Runs passlib hashing and verification on a bounded thread pool.
+
+    bcrypt releases the GIL while it works, so a small thread pool keeps the
+    event loop responsive without the cost of a process pool. `max_workers`
+    caps concurrent hashes; `max_queue` (0 = unbounded) caps callers waiting
+    for a worker, beyond which HasherBusy is raised.
+    """
+
+    def __init__(self, context, max_workers: int = 4, max_queue: int = 0):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self.max_queue and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HasherBusy("Password hashing queue is full")
+            self.queued += 1
+        submitted = time.perf_counter()
+        started = False
+
+        def task():
+            nonlocal started
+            begun = time.perf_counter()
+            # Leave the queue for a worker thread
+            with self._lock:
+                started = True
+                self.queued -= 1
+                self.in_flight += 1
+                self.wait_seconds += begun - submitted
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    self.completed += 1
+                    self.run_seconds += time.perf_counter() - begun
+
+        def release(future):
+            # A caller cancelled while the job was still queued: task() never runs, so free its slot here
+            with self._lock:
+                if not started:
+                    self.queued -= 1
+
+        future = self._executor.submit(task)
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also return a new hash when the stored one is deprecated."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(1000 * self.wait_seconds / self.completed, 2) if self.completed else 0.0,
+                "avg_run_ms": round(1000 * self.run_seconds / self.completed, 2) if self.completed else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
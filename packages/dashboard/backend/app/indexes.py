@@ -0,0 +1,213 @@
+# app/indexes.py
+from typing import Any, Dict, List, Tuple
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+import os
+
+from .findings import backfill_severity_rank, prepare_findings_key
+from .logs import get_logger
+
+log = get_logger("indexes")
+
+# Stale resources are purged by a TTL index once they have been gone this long
+STALE_RESOURCE_RETENTION_DAYS = int(os.getenv("STALE_RESOURCE_RETENTION_DAYS", "7"))
+
+# Daily tenant snapshots older than this are purged by a TTL index
+SNAPSHOT_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RETENTION_DAYS", "400"))
+
+# Indexes required by the API, per collection. Every per-tenant query leads with
+# user_id so each handler's filter is served by an index prefix.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "cloud_credentials": [
+        IndexModel([("user_id", ASCENDING)], name="user_unique", unique=True),
+    ],
+    "resources": [
+        IndexModel(
+            [("user_id", ASCENDING), ("platform", ASCENDING), ("id", ASCENDING)],
+            name="user_platform_id_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("stale_since", ASCENDING)],
+            name="stale_ttl",
+            expireAfterSeconds=STALE_RESOURCE_RETENTION_DAYS * 86400,
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("platform", ASCENDING), ("region", ASCENDING), ("type", ASCENDING)],
+            name="user_platform_region_type",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_keyset",
+        ),
+        IndexModel([("user_id", ASCENDING), ("changed_at", ASCENDING)], name="user_changed_at"),
+    ],
+    "security_issues": [
+        IndexModel(
+            [("user_id", ASCENDING), ("severity", ASCENDING), ("status", ASCENDING)],
+            name="user_severity_status",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("resource_id", ASCENDING), ("rule_id", ASCENDING)],
+            name="user_resource_rule_unique",
+            unique=True,
+        ),
+        # Keyset orders of the list route; either direction walks the same index
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_keyset",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("severity_rank", ASCENDING), ("_id", ASCENDING)],
+            name="user_severity_rank_keyset",
+        ),
+        # q= search; the user_id prefix keeps each search inside one tenant's entries
+        IndexModel(
+            [("user_id", ASCENDING), ("issue", TEXT), ("remediation", TEXT)],
+            name="user_text",
+        ),
+    ],
+    "cost_recommendations": [
+        IndexModel(
+            [("user_id", ASCENDING), ("impact", ASCENDING), ("status", ASCENDING)],
+            name="user_impact_status",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("resource_id", ASCENDING), ("rule_id", ASCENDING)],
+            name="user_resource_rule_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="user_keyset",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("estimated_savings", ASCENDING), ("_id", ASCENDING)],
+            name="user_savings_keyset",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("justification", TEXT)],
+            name="user_text",
+        ),
+    ],
+    "scan_jobs": [
+        IndexModel([("status", ASCENDING), ("available_at", ASCENDING)], name="status_available_at"),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease_expires_at"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+    ],
+    "scans": [
+        IndexModel([("user_id", ASCENDING), ("end_time", DESCENDING)], name="user_end_time"),
+    ],
+    "tenant_snapshots": [
+        IndexModel([("user_id", ASCENDING), ("day", ASCENDING)], name="user_day_unique", unique=True),
+        IndexModel([("day", ASCENDING)], name="day_ttl", expireAfterSeconds=SNAPSHOT_RETENTION_DAYS * 86400),
+    ],
+}
+
+# Representative (collection, filter, sort) shapes issued by the route handlers.
+# verify_query_plans() explains each one and rejects collection scans.
+QUERY_SHAPES: List[Tuple[str, Dict[str, Any], List[Tuple[str, int]]]] = [
+    ("users", {"email": "probe@example.com"}, []),
+    ("cloud_credentials", {"user_id": "probe"}, []),
+    ("resources", {"user_id": "probe"}, [("created_at", 1), ("_id", 1)]),
+    ("resources", {"user_id": "probe", "platform": "aws", "region": "us-east-1", "type": "t3.micro"}, []),
+    ("resources", {"user_id": "probe", "platform": "aws"}, [("created_at", 1), ("_id", 1)]),
+    ("resources", {"user_id": "probe", "platform": "aws", "id": "i-probe"}, []),
+    ("security_issues", {"user_id": "probe"}, []),
+    ("security_issues", {"user_id": "probe", "severity": "high", "status": "open"}, []),
+    ("security_issues", {"user_id": "probe", "platform": "aws"}, []),
+    ("cost_recommendations", {"user_id": "probe"}, []),
+    ("cost_recommendations", {"user_id": "probe", "impact": "high", "status": "open"}, []),
+    ("resources", {"user_id": "probe", "changed_at": {"$gt": datetime(2000, 1, 1)}}, []),
+    ("security_issues", {"user_id": "probe", "resource_id": {"$in": ["r"]}}, []),
+    ("security_issues", {"user_id": "probe", "resource_id": "r", "rule_id": "x"}, []),
+    ("cost_recommendations", {"user_id": "probe", "resource_id": {"$in": ["r"]}}, []),
+    ("cost_recommendations", {"user_id": "probe", "resource_id": "r", "rule_id": "x"}, []),
+    ("security_issues", {"user_id": "probe", "severity": {"$in": ["high", "critical"]}}, [("severity_rank", -1), ("_id", -1)]),
+    ("security_issues", {"user_id": "probe", "created_at": {"$gte": datetime(2000, 1, 1)}}, [("created_at", 1), ("_id", 1)]),
+    ("security_issues", {"user_id": "probe", "$text": {"$search": "ssh"}}, [("created_at", 1), ("_id", 1)]),
+    ("cost_recommendations", {"user_id": "probe", "estimated_savings": {"$gte": 100}}, [("estimated_savings", -1), ("_id", -1)]),
+    ("cost_recommendations", {"user_id": "probe", "impact": {"$in": ["high", "medium"]}}, [("created_at", 1), ("_id", 1)]),
+    ("cost_recommendations", {"user_id": "probe", "$text": {"$search": "rightsize"}}, []),
+    ("scans", {"user_id": "probe"}, [("end_time", -1)]),
+    ("tenant_snapshots", {"user_id": "probe", "day": {"$gte": datetime(2000, 1, 1)}}, [("day", 1)]),
+]
+
+
+# Collections whose findings must be made unique before user_resource_rule_unique can be built
+FINDINGS_COLLECTIONS = ("security_issues", "cost_recommendations")
+
+
+async def ensure_indexes(db) -> List[str]:
+    """Create any declared index that does not exist yet. Returns the names created.
+
+    Every index is attempted even if an earlier one fails; failures are raised
+    together at the end.
+    """
+    created = []
+    failures = []
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        missing = [model for model in models if model.document["name"] not in existing]
+        if not missing:
+            continue
+        if collection in FINDINGS_COLLECTIONS and "user_resource_rule_unique" not in existing:
+            cleaned = await prepare_findings_key(db, db[collection])
+            log.info("Prepared findings for unique index", extra={"collection": collection, **cleaned})
+        for model in missing:
+            try:
+                created.extend(await db[collection].create_indexes([model]))
+            except OperationFailure as e:
+                failures.append(f"{collection}.{model.document['name']}: {e}")
+    if failures:
+        raise RuntimeError("Could not create indexes: " + "; ".join(failures))
+    return created
+
+
+def _has_collscan(plan: Any) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(value) for value in plan)
+    return False
+
+
+async def verify_query_plans(db) -> None:
+    """Explain every known query shape and raise if any of them ends in a COLLSCAN."""
+    failures = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        if _has_collscan(plan.get("queryPlanner", {}).get("winningPlan", {})):
+            failures.append(f"{collection} {query} sort={sort}")
+
+    if failures:
+        raise RuntimeError("Queries without a backing index: " + "; ".join(failures))
+
+
+if __name__ == "__main__":
+    # python -m app.indexes: create missing indexes, then verify every query plan
+    import asyncio
+    from .database import DATABASE_NAME, create_client
+
+    async def main():
+        # Same connection settings as the API (TLS for DocumentDB, pool, DATABASE_NAME)
+        client = create_client()
+        db = client[DATABASE_NAME]
+        created = await ensure_indexes(db)
+        print(f"Created indexes: {', '.join(created) or 'none'}")
+        # Issues stored before severity_rank existed need it to sort by severity
+        print(f"Backfilled severity_rank on {await backfill_severity_rank(db.security_issues)} security issues")
+        await verify_query_plans(db)
+        print("All query plans use an index")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+# app/ingest.py
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from collections import Counter, defaultdict
+from datetime import datetime
+from pymongo import UpdateOne
+import hashlib
+import json
+import os
+
+# Number of resources written per bulk_write round trip
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "500"))
+
+# Fields owned by the ingestion engine rather than the collector
+_INSERT_ONLY_FIELDS = ("created_at",)
+
+# Fields left out of a resource's content fingerprint
+_UNFINGERPRINTED_FIELDS = {
+    "_id", "user_id", "created_at", "last_seen_scan", "last_seen_at",
+    "stale", "stale_since", "fingerprint", "changed_at",
+}
+
+
+def resource_fingerprint(resource: Dict[str, Any]) -> str:
+    """Content hash over a resource's type, tags and configuration."""
+    content = {k: v for k, v in resource.items() if k not in _UNFINGERPRINTED_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def _batches(items: Iterable[Dict[str, Any]], size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def upsert_resources(
+    db,
+    user_id: str,
+    scan_id: str,
+    resources: Iterable[Dict[str, Any]],
+    batch_size: int = SCAN_BATCH_SIZE,
+    on_batch: Optional[Callable[[int], Awaitable[None]]] = None
+) -> Dict[str, Counter]:
+    """Upsert scanned resources keyed on (user_id, platform, id).
+
+    Returns per-platform counters of `inserted` (new documents), `revived`
+    (previously stale documents seen again), `changed` (new, revived or with a
+    different fingerprint) and `seen` (everything written). Changed resources
+    get a fresh changed_at, which drives incremental security and cost scans.
+    `on_batch` is awaited with the size of each batch once it is written.
+    """
+    now = datetime.utcnow()
+    counts = {"inserted": Counter(), "revived": Counter(), "changed": Counter(), "seen": Counter()}
+
+    for batch in _batches(resources, batch_size):
+        # Read the stored fingerprints and stale flags for this batch in one query per platform
+        ids_by_platform = defaultdict(list)
+        for resource in batch:
+            ids_by_platform[resource["platform"]].append(resource["id"])
+        existing = {}
+        for platform, ids in ids_by_platform.items():
+            counts["seen"][platform] += len(ids)
+            async for doc in db.resources.find(
+                {"user_id": user_id, "platform": platform, "id": {"$in": ids}},
+                projection={"_id": 0, "id": 1, "fingerprint": 1, "stale": 1}
+            ):
+                existing[(platform, doc["id"])] = doc
+
+        # Stamped per batch, just before the write, so incremental scans that read a
+        # newer changed_at cannot have moved their watermark far past this one
+        changed_at = datetime.utcnow()
+        operations = []
+        for resource in batch:
+            platform = resource["platform"]
+            previous = existing.get((platform, resource["id"]))
+            fingerprint = resource_fingerprint(resource)
+
+            fields = {k: v for k, v in resource.items() if k not in _INSERT_ONLY_FIELDS}
+            fields.update({
+                "user_id": user_id,
+                "fingerprint": fingerprint,
+                "stale": False,
+                "last_seen_scan": scan_id,
+                "last_seen_at": now
+            })
+            update: Dict[str, Any] = {
+                "$set": fields,
+                "$setOnInsert": {"created_at": resource.get("created_at") or now}
+            }
+
+            # Resources seen again after being marked stale count towards the live inventory again
+            revived = bool(previous and previous.get("stale"))
+            if revived:
+                counts["revived"][platform] += 1
+                update["$unset"] = {"stale_since": ""}
+            if previous is None or revived or previous.get("fingerprint") != fingerprint:
+                counts["changed"][platform] += 1
+                fields["changed_at"] = changed_at
+
+            operations.append(UpdateOne(
+                {"user_id": user_id, "platform": platform, "id": resource["id"]},
+                update,
+                upsert=True
+            ))
+
+        result = await db.resources.bulk_write(operations, ordered=False)
+        for index in result.upserted_ids:
+            counts["inserted"][batch[index]["platform"]] += 1
+        if on_batch:
+            await on_batch(len(batch))
+
+    return counts
+
+
+async def mark_stale_resources(db, user_id: str, scan_id: str, platforms: List[str]) -> Counter:
+    """Flag resources on the scanned platforms that this scan did not see. Returns per-platform counts."""
+    stale = Counter()
+    now = datetime.utcnow()
+    for platform in platforms:
+        result = await db.resources.update_many(
+            {"user_id": user_id, "platform": platform, "last_seen_scan": {"$ne": scan_id}, "stale": {"$ne": True}},
+            {"$set": {"stale": True, "stale_since": now, "changed_at": now}}
+        )
+        stale[platform] += result.modified_count
+    return stale
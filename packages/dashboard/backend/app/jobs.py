@@ -0,0 +1,156 @@
+# app/jobs.py
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import os
+import uuid
+
+# Job kinds accepted by the queue; "bulk" runs a large bulk remediate/apply
+SCAN_KINDS = ("resources", "security", "costs", "bulk")
+
+# A job whose lease is not renewed within this window is picked up by another worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY_SECONDS = int(os.getenv("JOB_RETRY_DELAY_SECONDS", "30"))
+
+
+async def enqueue_scan(db, user_id: str, kind: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Queue a scan for a worker to pick up and return its scan_id.
+
+    `options` are passed to the scan task as keyword arguments.
+    """
+    if kind not in SCAN_KINDS:
+        raise ValueError(f"Unknown scan kind: {kind}")
+
+    scan_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    await db.scan_jobs.insert_one({
+        "_id": scan_id,
+        "user_id": user_id,
+        "kind": kind,
+        "options": options or {},
+        "status": "queued",
+        "attempts": 0,
+        "available_at": now,
+        "created_at": now,
+        "updated_at": now
+    })
+    return scan_id
+
+
+async def busy_tenants(db) -> List[str]:
+    """Tenants that currently hold a live lease on some job."""
+    return await db.scan_jobs.distinct(
+        "user_id",
+        {"status": "running", "lease_expires_at": {"$gt": datetime.utcnow()}}
+    )
+
+
+async def lease_job(db, worker_id: str, exclude_users: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Atomically claim the oldest runnable job.
+
+    Runnable means queued and due, or running with an expired lease (its worker
+    died). Jobs of tenants in `exclude_users` are skipped so that one tenant's
+    backlog cannot occupy every worker slot. The exclusion list is read before
+    the lease, so this fairness is best effort, not a per-tenant lock.
+    """
+    now = datetime.utcnow()
+    query: Dict[str, Any] = {
+        "attempts": {"$lt": JOB_MAX_ATTEMPTS},
+        "$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_expires_at": {"$lte": now}},
+        ]
+    }
+    if exclude_users:
+        query["user_id"] = {"$nin": list(exclude_users)}
+
+    return await db.scan_jobs.find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "lease_owner": worker_id,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "heartbeat_at": now,
+                "started_at": now,
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def heartbeat(db, job: Dict[str, Any], worker_id: str) -> bool:
+    """Extend the lease. Returns False if another worker has taken the job over."""
+    now = datetime.utcnow()
+    result = await db.scan_jobs.update_one(
+        {"_id": job["_id"], "lease_owner": worker_id, "status": "running"},
+        {"$set": {
+            "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "heartbeat_at": now
+        }}
+    )
+    return result.matched_count == 1
+
+
+async def complete_job(db, job: Dict[str, Any], worker_id: str) -> None:
+    now = datetime.utcnow()
+    await db.scan_jobs.update_one(
+        {"_id": job["_id"], "lease_owner": worker_id},
+        {"$set": {"status": "completed", "finished_at": now, "updated_at": now},
+         "$unset": {"lease_expires_at": ""}}
+    )
+
+
+async def fail_job(db, job: Dict[str, Any], worker_id: str, error: str) -> None:
+    """Requeue with a delay, or mark failed once attempts are exhausted."""
+    now = datetime.utcnow()
+    if job.get("attempts", 0) < JOB_MAX_ATTEMPTS:
+        update = {"status": "queued", "available_at": now + timedelta(seconds=JOB_RETRY_DELAY_SECONDS)}
+    else:
+        update = {"status": "failed", "finished_at": now}
+    update.update({"error": error, "updated_at": now})
+
+    await db.scan_jobs.update_one(
+        {"_id": job["_id"], "lease_owner": worker_id},
+        {"$set": update, "$unset": {"lease_expires_at": ""}}
+    )
+
+
+async def fail_abandoned_jobs(db) -> int:
+    """Mark jobs failed whose lease expired on their final attempt."""
+    now = datetime.utcnow()
+    result = await db.scan_jobs.update_many(
+        {"status": "running", "lease_expires_at": {"$lte": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+        {"$set": {"status": "failed", "error": "Lease expired", "finished_at": now, "updated_at": now},
+         "$unset": {"lease_expires_at": ""}}
+    )
+    return result.modified_count
+
+
+async def claim_periodic_run(db, name: str, worker_id: str, interval_seconds: float) -> bool:
+    """Claim the current run of a fleet-wide periodic task such as snapshotting.
+
+    Each task has one document in `periodic_runs` holding when it is next due;
+    the first worker to find it due moves that on by `interval_seconds` and
+    runs the task. Returns False when another worker already has this period.
+    """
+    now = datetime.utcnow()
+    try:
+        await db.periodic_runs.update_one(
+            {"_id": name, "next_run_at": {"$lte": now}},
+            {"$set": {
+                "owner": worker_id,
+                "started_at": now,
+                "next_run_at": now + timedelta(seconds=interval_seconds)
+            }},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Not due: the filter missed, so the upsert collided with the existing document
+        return False
+    return True
@@ -1,42 +1,83 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Request
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, status, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from fastapi.encoders import jsonable_encoder
 from typing import List, Optional, Dict, Any, Union, Annotated
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
-import motor.motor_asyncio
 import jwt
 from passlib.context import CryptContext
 import os
-import ssl
 import uuid
 import time
+import json
+import asyncio
+from collections import Counter, defaultdict
+from pymongo.errors import WaitQueueTimeoutError
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
 
+from .pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, KEYSET_SORT,
+    encode_cursor, apply_cursor, keyset_sort, parse_sort, wants_ndjson,
+)
+from .database import DATABASE_NAME, MONGO_READ_MAX_STALENESS_SECONDS, create_client, read_database
+from .indexes import ensure_indexes, verify_query_plans
+from .auth_cache import UserCache
+from .hashing import PasswordHasher, HasherBusy
+from .ingest import SCAN_BATCH_SIZE, upsert_resources, mark_stale_resources
+from .rules import security_rules, evaluate_in_batches
+from .pricing import get_pricing_catalog
+from .jobs import enqueue_scan
+from .progress import ScanProgress, TERMINAL_STATES, scan_status
+from .collectors import CollectorScheduler, build_collection_tasks
+from .bulk import (
+    BULK_ACTIONS, BULK_SYNC_LIMIT, BULK_MAX_IDS, bulk_query, count_bulk_targets, apply_bulk_action,
+    already_in_status, bulk_item_results,
+)
+from .analytics import (
+    TREND_BUCKETS, MAX_TREND_DAYS, findings_match, cost_breakdown, security_breakdown, findings_trend,
+)
+from .snapshots import MAX_SNAPSHOT_DAYS, get_snapshots
+from .serialization import RowSerializer, FastJSONResponse, as_object_id, dumps, stream_rows
+from .export import EXPORT_FORMATS, export_stream, export_filename, pq
+from .caching import (
+    RESPONSE_CACHE_MAX_BYTES, build_response_cache, is_cacheable, get_data_version_state, bump_data_version,
+    make_etag, etag_matches,
+)
+from .logs import configure_logging, get_logger, sample_access_log
+from .metrics import (
+    HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT, route_template, register_stats, render_metrics,
+)
+from .findings import (
+    get_watermark, set_watermark, changed_resources_query, sync_findings, ChangeTracker,
+    SECURITY_ISSUE_SORTS, COST_RECOMMENDATION_SORTS, findings_list_query,
+)
+from .summary import (
+    resource_count_deltas, security_deltas, cost_deltas,
+    apply_summary_delta, recompute_summary, get_summary,
+)
+
 # Load environment variables
 load_dotenv()
 
-# MongoDB/DocumentDB Configuration
-MONGODB_URL = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
-
-# Configure SSL for DocumentDB if needed
-if "docdb" in MONGODB_URL or os.getenv("USE_SSL", "false").lower() == "true":
-    ssl_context = ssl.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl.CERT_NONE
-    
-    client = motor.motor_asyncio.AsyncIOMotorClient(
-        MONGODB_URL,
-        tls=True,
-        tlsAllowInvalidCertificates=True,
-        retryWrites=False,  # DocumentDB doesn't support retryWrites
-        serverSelectionTimeoutMS=5000
-    )
-else:
-    client = motor.motor_asyncio.AsyncIOMotorClient(MONGODB_URL)
+configure_logging()
+log = get_logger("api")
 
-db = client.spearpoint
+# Per-process state: the Mongo client, caches and the hashing pool are created by
+# init_worker_state()/connect_database() in each worker after fork (see lifespan)
+client = None
+db = None
+# db with MONGO_READ_PREFERENCE, for the read-heavy list, summary and analytics routes
+read_db = None
+user_cache: Optional[UserCache] = None
+password_hasher: Optional[PasswordHasher] = None
+response_cache = None
+
+# Seconds between status checks on the scan progress event stream
+SCAN_EVENTS_INTERVAL_SECONDS = float(os.getenv("SCAN_EVENTS_INTERVAL_SECONDS", "1"))
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET", "development_secret_key")
@@ -46,24 +87,49 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Initialize FastAPI
-app = FastAPI(
-    title="SpearPoint API",
-    description="SpearPoint Cloud Governance Platform API",
-    version="0.1.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json"
-)
+def init_worker_state():
+    global user_cache, password_hasher, response_cache
+    # Authenticated user cache (token subject -> User)
+    user_cache = UserCache(
+        maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+    )
+    password_hasher = PasswordHasher(
+        pwd_context,
+        max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+        max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "0"))
+    )
+    # Optional cache of read responses, keyed by ETag (RESPONSE_CACHE_URL)
+    response_cache = build_response_cache()
+
+def connect_database():
+    global client, db, read_db
+    client = create_client()
+    db = client[DATABASE_NAME]
+    read_db = read_database(db)
+    return db
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=os.getenv("CORS_ORIGIN", "http://localhost:3000").split(","),
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+# Component stats exported on /metrics; looked up on each scrape so they follow the current worker state
+register_stats("auth_cache", lambda: user_cache.stats() if user_cache else None, counters=["hits", "misses", "evictions"])
+register_stats(
+    "password_hasher",
+    lambda: password_hasher.stats() if password_hasher else None,
+    counters=["completed", "rejected"]
 )
+register_stats(
+    "response_cache",
+    lambda: response_cache.stats() if response_cache else None,
+    counters=["hits", "misses", "evictions", "errors"]
+)
+
+# Set by conditional_get for requests that must not read from a lagging secondary
+read_primary: ContextVar[bool] = ContextVar("read_primary", default=False)
+
+def reads():
+    # Database for the read-heavy routes: read_db, or the primary while a recent write may not have replicated
+    return db if read_primary.get() else read_db
+
+router = APIRouter()
 
 # Models
 class User(BaseModel):
@@ -87,6 +153,15 @@ class UserResponse(BaseModel):
     role: str
     company: Optional[str] = None
 
+class TokenClaims(BaseModel):
+    id: str
+    role: str = "user"
+    company: Optional[str] = None
+
+class ProfileUpdateRequest(BaseModel):
+    name: Optional[str] = None
+    company: Optional[str] = None
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -114,6 +189,7 @@ class CloudResource(BaseModel):
 
 class SecurityIssue(BaseModel):
     id: Optional[str] = None
+    rule_id: Optional[str] = None
     resource_id: str
     resource_type: str
     platform: str
@@ -122,13 +198,18 @@ class SecurityIssue(BaseModel):
     remediation: str
     compliance: Optional[List[str]] = None
     status: str = "open"
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
 class CostRecommendation(BaseModel):
     id: Optional[str] = None
+    rule_id: Optional[str] = None
     resource_id: str
     resource_type: str
+    platform: Optional[str] = None
+    region: Optional[str] = None
     current_configuration: str
     recommended_configuration: str
     estimated_savings: float
@@ -137,64 +218,236 @@ class CostRecommendation(BaseModel):
     impact: str
     justification: Optional[str] = None
     status: str = "open"
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
+class BulkActionRequest(BaseModel):
+    # Either explicit finding ids or filters: severity/platform for issues, impact/platform for recommendations
+    ids: Optional[List[str]] = None
+    severity: Optional[str] = None
+    platform: Optional[str] = None
+    impact: Optional[str] = None
+
 class CloudCredentials(BaseModel):
     aws: Optional[Dict[str, str]] = None
     azure: Optional[Dict[str, str]] = None
     gcp: Optional[Dict[str, str]] = None
 
-# Database startup and shutdown events
-@app.on_event("startup")
+# List endpoints skip per-row model construction; see app/serialization.py
+resource_rows = RowSerializer(CloudResource)
+security_issue_rows = RowSerializer(SecurityIssue)
+cost_recommendation_rows = RowSerializer(CostRecommendation)
+
+def select_fields(serializer: RowSerializer, fields: Optional[str]) -> RowSerializer:
+    # fields=a,b,c narrows both the Mongo projection and the rows returned
+    try:
+        return serializer.select(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+async def list_findings(
+    collection,
+    query: Dict[str, Any],
+    serializer: RowSerializer,
+    sorts: Dict[str, str],
+    sort: Optional[str],
+    after: Optional[str],
+    limit: Optional[int]
+) -> Response:
+    # Sorting and paging run in Mongo on the (user_id, sort field, _id) indexes. Pages are
+    # returned when after= or limit= is given; otherwise the whole result, as before, streamed.
+    try:
+        field, descending = parse_sort(sort, sorts)
+        query = apply_cursor(query, after, field, descending)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    paged = after is not None or limit is not None
+    serializer = serializer.sorted_by(field)
+    
+    cursor = collection.find(query, projection=serializer.projection)
+    if sort or paged:
+        cursor = cursor.sort(keyset_sort(field, descending))
+    if not paged:
+        return StreamingResponse(stream_rows(cursor, serializer), media_type="application/json")
+    
+    # Fetch one extra document to know whether another page exists
+    page_size = limit or DEFAULT_PAGE_SIZE
+    documents = await cursor.limit(page_size + 1).to_list(length=page_size + 1)
+    next_cursor = None
+    if len(documents) > page_size:
+        next_cursor = encode_cursor(documents[page_size - 1], field, descending)
+        documents = documents[:page_size]
+    rows = serializer.rows(documents)
+    
+    return FastJSONResponse({
+        "status": "success",
+        "results": len(rows),
+        "next_cursor": next_cursor,
+        "data": rows
+    })
+
+# Startup and shutdown, run once in every worker process
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_worker_state()
+    connect_database()
+    await startup_db_client()
+    yield
+    await shutdown_db_client()
+
 async def startup_db_client():
     try:
         # Verify MongoDB connection
         await db.command("ping")
-        print("Connected to MongoDB")
+        log.info("Connected to MongoDB", extra={"pid": os.getpid()})
     except Exception as e:
-        print(f"Could not connect to MongoDB: {e}")
+        log.error("Could not connect to MongoDB", extra={"error": str(e)})
+        return
+
+    try:
+        created = await ensure_indexes(db)
+        if created:
+            log.info("Created indexes", extra={"indexes": created})
+    except Exception as e:
+        log.error("Index bootstrap failed", extra={"error": str(e)})
+
+    # Refuse to start if a route handler's query would fall back to a collection scan
+    if os.getenv("VERIFY_QUERY_PLANS", "false").lower() == "true":
+        await verify_query_plans(db)
 
-@app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
-    print("MongoDB connection closed")
+    password_hasher.shutdown()
+    if response_cache:
+        await response_cache.close()
+    log.info("MongoDB connection closed", extra={"pid": os.getpid()})
 
-# Request logging middleware
-@app.middleware("http")
+# Request metrics and logging middleware
 async def log_requests(request: Request, call_next):
     request_id = str(uuid.uuid4())
-    start_time = time.time()
+    route = route_template(request.app.routes, request.scope)
+    in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(request.method, route)
+    in_flight.inc()
+    start_time = time.perf_counter()
+    status_code = 500
     
-    response = await call_next(request)
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        process_time = time.perf_counter() - start_time
+        in_flight.dec()
+        HTTP_REQUEST_DURATION.labels(request.method, route, str(status_code)).observe(process_time)
+        # The access log; the queue handler keeps the write off the request (ACCESS_LOG_SAMPLE_RATE thins it)
+        if sample_access_log(status_code):
+            log.info("Request completed", extra={
+                "request_id": request_id,
+                "method": request.method,
+                "route": route,
+                "path": request.url.path,
+                "status": status_code,
+                "duration_ms": round(process_time * 1000, 2)
+            })
     
-    process_time = time.time() - start_time
-    print(f"Request {request_id} [{request.method}] {request.url.path} completed in {process_time:.4f}s")
+    return response
+
+# Conditional GET middleware
+async def conditional_get(request: Request, call_next):
+    # Read endpoints are answered from the tenant's data version before any query runs
+    if request.method != "GET" or not is_cacheable(request.url.path, request.query_params):
+        return await call_next(request)
+    accept = request.headers.get("accept")
+    if wants_ndjson(accept):
+        return await call_next(request)
+    try:
+        user_id = decode_token(get_bearer_token(request))["sub"]
+    except HTTPException:
+        # Let the route reject the request as usual
+        return await call_next(request)
+    
+    # The version comes from the primary. Until a bump is older than the secondaries'
+    # staleness bound they may not have its data yet, so the handler reads the primary too;
+    # otherwise a stale body could be cached and answered with 304 under the new ETag.
+    version, bumped_at = await get_data_version_state(db, user_id)
+    if bumped_at is not None and (
+        MONGO_READ_MAX_STALENESS_SECONDS < 0
+        or datetime.utcnow() - bumped_at < timedelta(seconds=MONGO_READ_MAX_STALENESS_SECONDS)
+    ):
+        read_primary.set(True)
+    etag = make_etag(user_id, version, str(request.url), accept)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if response_cache:
+        body = await response_cache.get(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
+    
+    response = await call_next(request)
+    if response.status_code != status.HTTP_200_OK:
+        return response
     
+    # The body streams through untouched, keeping the handler's headers
+    response.headers.update(headers)
+    if response_cache:
+        response.body_iterator = cache_body(response.body_iterator, etag)
     return response
 
+async def cache_body(chunks, etag: str):
+    # Pass a response body through, storing it under `etag` once complete unless it outgrew the cache
+    body: Optional[List[bytes]] = []
+    size = 0
+    async for chunk in chunks:
+        if body is not None:
+            size += len(chunk)
+            if size > RESPONSE_CACHE_MAX_BYTES:
+                body = None
+            else:
+                body.append(chunk)
+        yield chunk
+    if body is not None:
+        await response_cache.set(etag, b"".join(body))
+
 # Exception handlers
-@app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     return JSONResponse(
         status_code=exc.status_code,
         content={"status": "error", "message": exc.detail},
     )
 
-@app.exception_handler(Exception)
+async def hasher_busy_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error", "message": "Authentication service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+async def pool_exhausted_handler(request, exc):
+    # Every pooled connection stayed busy for MONGO_WAIT_QUEUE_TIMEOUT_MS
+    log.warning("MongoDB connection pool exhausted", extra={"path": request.url.path})
+    return JSONResponse(
+        status_code=503,
+        content={"status": "error", "message": "Service busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 async def general_exception_handler(request, exc):
-    print(f"Unhandled error: {str(exc)}")
+    log.error("Unhandled error", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(
         status_code=500,
         content={"status": "error", "message": "Internal server error"},
     )
 
 # Authentication functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# bcrypt runs on the hasher's thread pool so it never blocks the event loop
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await password_hasher.hash(password)
 
 async def get_user(email: str):
     user = await db.users.find_one({"email": email})
@@ -207,8 +460,13 @@ async def authenticate_user(email: str, password: str):
     user = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.password)
+    if not valid:
         return False
+    # Upgrade hashes that passlib reports as deprecated
+    if new_hash:
+        await db.users.update_one({"email": user.email}, {"$set": {"password": new_hash}})
+        user.password = new_hash
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -221,35 +479,72 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str):
+def create_user_token(user_id: str, role: str, company: Optional[str]):
+    # Carry role and company in the token so claims-only routes never touch the database
+    return create_access_token(data={"sub": user_id, "role": role, "company": company})
+
+def decode_token(token: Optional[str]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        if payload.get("sub") is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    
+    return payload
+
+async def load_user(user_id: str):
     # Find user by ID
-    user = await db.users.find_one({"_id": user_id})
+    user = await db.users.find_one({"_id": as_object_id(user_id)}, projection={"password": 0})
     if user is None:
-        raise credentials_exception
+        return None
     
     # Convert _id to id
     user["id"] = str(user.pop("_id"))
     return User(**user)
 
-# Authentication dependency
-async def get_current_active_user(token: str = Depends(lambda x: x.headers.get("Authorization").split(" ")[1] if x.headers.get("Authorization") else None)):
+async def get_current_user(token: str):
+    payload = decode_token(token)
+    user_id: str = payload["sub"]
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    user = await load_user(user_id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user_cache.set(user_id, user)
+    return user
+
+def get_bearer_token(request: Request) -> Optional[str]:
+    authorization = request.headers.get("Authorization")
+    if authorization and " " in authorization:
+        return authorization.split(" ", 1)[1]
+    return None
+
+# Authentication dependencies
+async def get_current_active_user(token: Optional[str] = Depends(get_bearer_token)):
     return await get_current_user(token)
 
+async def get_current_claims(token: Optional[str] = Depends(get_bearer_token)):
+    # For routes that only need identity, role and company: no database round trip
+    payload = decode_token(token)
+    return TokenClaims(id=payload["sub"], role=payload.get("role", "user"), company=payload.get("company"))
+
 # Auth routes
-@app.post("/api/auth/login", response_model=dict)
+@router.post("/api/auth/login", response_model=dict)
 async def login(login_data: LoginRequest):
     user = await authenticate_user(login_data.email, login_data.password)
     if not user:
@@ -266,9 +561,7 @@ async def login(login_data: LoginRequest):
     )
     
     # Create token
-    access_token = create_access_token(
-        data={"sub": str(user.id)}
-    )
+    access_token = create_user_token(str(user.id), user.role, user.company)
     
     # Return user without password
     user_dict = user.dict()
@@ -280,7 +573,7 @@ async def login(login_data: LoginRequest):
         "user": user_dict
     }
 
-@app.post("/api/auth/register", response_model=dict)
+@router.post("/api/auth/register", response_model=dict)
 async def register(register_data: RegisterRequest):
     # Check if user already exists
     existing_user = await db.users.find_one({"email": register_data.email})
@@ -292,7 +585,7 @@ async def register(register_data: RegisterRequest):
     
     # Create new user
     user_data = register_data.dict()
-    user_data["password"] = get_password_hash(user_data["password"])
+    user_data["password"] = await get_password_hash(user_data["password"])
     user_data["created_at"] = datetime.utcnow()
     user_data["updated_at"] = datetime.utcnow()
     
@@ -301,12 +594,11 @@ async def register(register_data: RegisterRequest):
     user_data["id"] = str(result.inserted_id)
     
     # Create token
-    access_token = create_access_token(
-        data={"sub": str(result.inserted_id)}
-    )
+    access_token = create_user_token(str(result.inserted_id), "user", user_data.get("company"))
     
     # Return user without password
     del user_data["password"]
+    user_data.pop("_id", None)
     
     return {
         "status": "success",
@@ -314,7 +606,7 @@ async def register(register_data: RegisterRequest):
         "user": user_data
     }
 
-@app.get("/api/auth/profile", response_model=dict)
+@router.get("/api/auth/profile", response_model=dict)
 async def get_profile(current_user: User = Depends(get_current_active_user)):
     return {
         "status": "success",
@@ -327,17 +619,48 @@ async def get_profile(current_user: User = Depends(get_current_active_user)):
         }
     }
 
-@app.post("/api/auth/logout", response_model=dict)
-async def logout():
+@router.put("/api/auth/profile", response_model=dict)
+async def update_profile(
+    profile: ProfileUpdateRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    updates = {k: v for k, v in profile.dict().items() if v is not None}
+    if updates:
+        updates["updated_at"] = datetime.utcnow()
+        await db.users.update_one({"_id": as_object_id(current_user.id)}, {"$set": updates})
+        user_cache.invalidate(current_user.id)
+
+    user = await load_user(current_user.id)
+    return {
+        "status": "success",
+        # Reissue the token so its company claim matches the profile
+        "token": create_user_token(user.id, user.role, user.company),
+        "user": {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "role": user.role,
+            "company": user.company
+        }
+    }
+
+@router.post("/api/auth/logout", response_model=dict)
+async def logout(token: Optional[str] = Depends(get_bearer_token)):
     # JWT tokens are stateless, so we don't need to invalidate them
     # In a production environment, you might want to blacklist the token
+    # Drop the cached user so the next request with this subject re-reads the database
+    if token:
+        try:
+            user_cache.invalidate(decode_token(token)["sub"])
+        except HTTPException:
+            pass
     return {"status": "success", "message": "Logged out successfully"}
 
 # Cloud provider connections
-@app.post("/api/connect/provider", response_model=dict)
+@router.post("/api/connect/provider", response_model=dict)
 async def connect_provider(
     credentials: CloudCredentials,
-    current_user: User = Depends(get_current_active_user)
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
     # This would typically connect to the cloud providers and validate credentials
     # For now, we'll just store them (in a real app, encrypt these!)
@@ -372,12 +695,17 @@ async def connect_provider(
     }
 
 # Resources routes
-@app.get("/api/resources", response_model=dict)
+@router.get("/api/resources", response_model=dict)
 async def get_resources(
+    request: Request,
     platform: Optional[str] = None,
     region: Optional[str] = None,
     type: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user)
+    include_stale: bool = False,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
     # Build query
     query = {"user_id": current_user.id}
@@ -387,445 +715,637 @@ async def get_resources(
         query["region"] = region
     if type:
         query["type"] = type
-    
-    resources = []
-    cursor = db.resources.find(query)
-    async for document in cursor:
-        document["id"] = str(document.pop("_id"))
-        resources.append(CloudResource(**document))
-    
-    return {
+    if not include_stale:
+        query["stale"] = {"$ne": True}
+
+    try:
+        query = apply_cursor(query, after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    serializer = select_fields(resource_rows, fields)
+
+    # Streaming mode: write each document as it comes off the cursor
+    if wants_ndjson(request.headers.get("accept")):
+        cursor = reads().resources.find(query, projection=serializer.projection).sort(KEYSET_SORT)
+        if limit:
+            cursor = cursor.limit(limit)
+        return StreamingResponse(
+            stream_ndjson(cursor, serializer),
+            media_type="application/x-ndjson"
+        )
+
+    # Pages are returned when after= or limit= is given; otherwise every resource, as before,
+    # streamed off the cursor rather than loaded into a list
+    cursor = reads().resources.find(query, projection=serializer.projection).sort(KEYSET_SORT)
+    if after is None and limit is None:
+        return StreamingResponse(stream_rows(cursor, serializer), media_type="application/json")
+
+    # Fetch one extra document to know whether another page exists
+    page_size = limit or DEFAULT_PAGE_SIZE
+    documents = await cursor.limit(page_size + 1).to_list(length=page_size + 1)
+    next_cursor = encode_cursor(documents[page_size - 1]) if len(documents) > page_size else None
+
+    resources = serializer.rows(documents[:page_size])
+
+    return FastJSONResponse({
         "status": "success",
         "results": len(resources),
+        "next_cursor": next_cursor,
         "data": resources
-    }
+    })
 
-@app.post("/api/resources/scan", response_model=dict)
-async def scan_resources(
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_active_user)
-):
-    # In a real application, this would trigger a scan of cloud resources
-    scan_id = str(uuid.uuid4())
-    
-    # Add background task to scan resources
-    background_tasks.add_task(scan_cloud_resources, current_user.id, scan_id)
+async def stream_ndjson(cursor, serializer: RowSerializer):
+    # Yield one JSON line per document so memory stays flat regardless of result size
+    async for document in cursor:
+        yield dumps(serializer.row(document)) + b"\n"
+
+@router.post("/api/resources/scan", response_model=dict)
+async def scan_resources(current_user: TokenClaims = Depends(get_current_claims)):
+    # Queue the scan; a worker process (python -m app.worker) runs it
+    scan_id = await enqueue_scan(db, current_user.id, "resources")
     
     return {
         "status": "success",
-        "message": "Resource scan started",
+        "message": "Resource scan queued",
         "scan_id": scan_id
     }
 
-# Background task to scan resources
+# Scan task for resources, run by the scan worker
 async def scan_cloud_resources(user_id: str, scan_id: str):
-    # This would be a long-running task to scan cloud providers
-    # For demonstration, we'll just create some sample resources
+    # Run every collector for the user's connected platforms concurrently and
+    # upsert their pages as they arrive
+    progress = ScanProgress(db, scan_id, "resources")
+    await progress.start()
     
     # Get user's cloud credentials
     credentials = await db.cloud_credentials.find_one({"user_id": user_id})
     
     if not credentials:
-        print(f"No cloud credentials found for user {user_id}")
+        log.warning("No cloud credentials found", extra={"user_id": user_id, "scan_id": scan_id})
         return
     
-    # Sample resources for demo purposes
-    sample_resources = []
+    tasks = build_collection_tasks(user_id, credentials)
+    scheduler = CollectorScheduler()
+    counts = defaultdict(Counter)
+    async for page in scheduler.run(tasks):
+        page_counts = await upsert_resources(db, user_id, scan_id, page, on_batch=progress.advance)
+        for key, counter in page_counts.items():
+            counts[key].update(counter)
+        await bump_data_version(db, user_id)
     
-    # AWS resources
-    if credentials.get("aws"):
-        sample_resources.append({
-            "user_id": user_id,
-            "id": f"i-{uuid.uuid4().hex[:8]}",
-            "name": "example-ec2-instance",
-            "type": "t3.micro",
-            "platform": "aws",
-            "region": "us-east-1",
-            "tags": {"Environment": "development", "Owner": "spearpoint"},
-            "created_at": datetime.utcnow()
-        })
-    
-    # Azure resources
-    if credentials.get("azure"):
-        sample_resources.append({
-            "user_id": user_id,
-            "id": f"/subscriptions/example/resourceGroups/example-rg/providers/Microsoft.Compute/virtualMachines/{uuid.uuid4().hex[:8]}",
-            "name": "example-azure-vm",
-            "type": "Standard_B2s",
-            "platform": "azure",
-            "region": "eastus",
-            "resource_group": "example-rg",
-            "tags": {"environment": "development", "owner": "spearpoint"},
-            "created_at": datetime.utcnow()
-        })
-    
-    # GCP resources
-    if credentials.get("gcp"):
-        sample_resources.append({
-            "user_id": user_id,
-            "id": f"projects/example/zones/us-central1-a/instances/{uuid.uuid4().hex[:8]}",
-            "name": "example-gcp-instance",
-            "type": "e2-medium",
-            "platform": "gcp",
-            "zone": "us-central1-a",
-            "tags": {"environment": "development", "owner": "spearpoint"},
-            "created_at": datetime.utcnow()
-        })
-    
-    # Insert resources into database
-    if sample_resources:
-        await db.resources.insert_many(sample_resources)
-        print(f"Added {len(sample_resources)} sample resources for user {user_id}")
-    
-    # Create a scan record
-    await db.scans.insert_one({
+    # Only sweep platforms whose collectors all succeeded, so a failed region
+    # does not mark its resources as gone
+    failed_platforms = scheduler.failed_platforms()
+    scanned_platforms = sorted({collector.platform for collector, _, _ in tasks} - set(failed_platforms))
+    stale = await mark_stale_resources(db, user_id, scan_id, scanned_platforms)
+    resource_count = sum(counts["seen"].values())
+    log.info("Resource scan finished", extra={
+        "user_id": user_id,
+        "scan_id": scan_id,
+        "resources": resource_count,
+        "inserted": sum(counts["inserted"].values()),
+        "stale": sum(stale.values()),
+        "duration_ms": progress.elapsed_ms
+    })
+    
+    # Record the scan under its job id, so a retried job replaces its earlier attempt's record
+    scan_record = {
         "scan_id": scan_id,
         "user_id": user_id,
-        "status": "completed",
-        "resource_count": len(sample_resources),
-        "start_time": datetime.utcnow() - timedelta(seconds=5),
+        "status": "partial" if scheduler.failures else "completed",
+        "resource_count": resource_count,
+        "start_time": progress.started_at,
         "end_time": datetime.utcnow(),
-        "duration_ms": 5000
-    })
+        "duration_ms": progress.elapsed_ms
+    }
+    if scheduler.failures:
+        scan_record["errors"] = scheduler.failures
+    await db.scans.replace_one({"_id": scan_id}, scan_record, upsert=True)
+
+    # Fold the inventory change and scan into the dashboard summary
+    live_delta = counts["inserted"] + counts["revived"]
+    live_delta.subtract(stale)
+    await apply_summary_delta(db, user_id, resource_count_deltas(live_delta), latest_scan=scan_record)
+    await bump_data_version(db, user_id)
+
+    # Fail the job so the queue retries the collectors that errored
+    if scheduler.failures:
+        raise RuntimeError(f"Collectors failed for {', '.join(failed_platforms)}")
+
+# Scan status routes
+@router.get("/api/scans/{scan_id}", response_model=dict)
+async def get_scan_status(
+    scan_id: str,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    job = await db.scan_jobs.find_one({"_id": scan_id, "user_id": current_user.id})
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan not found",
+        )
+    
+    return {
+        "status": "success",
+        "data": scan_status(job)
+    }
+
+@router.get("/api/scans/{scan_id}/events")
+async def stream_scan_status(
+    scan_id: str,
+    request: Request,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    job = await db.scan_jobs.find_one({"_id": scan_id, "user_id": current_user.id}, projection={"_id": 1})
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Scan not found",
+        )
+    
+    return StreamingResponse(
+        scan_status_events(request, scan_id, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def scan_status_events(request: Request, scan_id: str, user_id: str):
+    # Server-sent events: push the status whenever it changes until the scan ends
+    last_payload = None
+    while not await request.is_disconnected():
+        job = await db.scan_jobs.find_one({"_id": scan_id, "user_id": user_id})
+        if job is None:
+            return
+        payload = json.dumps(jsonable_encoder(scan_status(job)))
+        if payload != last_payload:
+            yield f"event: progress\ndata: {payload}\n\n"
+            last_payload = payload
+        if job.get("status") in TERMINAL_STATES:
+            yield f"event: end\ndata: {payload}\n\n"
+            return
+        await asyncio.sleep(SCAN_EVENTS_INTERVAL_SECONDS)
 
 # Security routes
-@app.get("/api/security/issues", response_model=dict)
+@router.get("/api/security/issues", response_model=dict)
 async def get_security_issues(
     severity: Optional[str] = None,
     platform: Optional[str] = None,
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user)
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    sort: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    # Build query
-    query = {"user_id": current_user.id}
-    if severity:
-        query["severity"] = severity
-    if platform:
-        query["platform"] = platform
-    if status:
-        query["status"] = status
-    
-    issues = []
-    cursor = db.security_issues.find(query)
-    async for document in cursor:
-        document["id"] = str(document.pop("_id"))
-        issues.append(SecurityIssue(**document))
-    
-    return {
-        "status": "success",
-        "results": len(issues),
-        "data": issues
-    }
+    # severity/platform/status accept comma separated values; sort=severity or
+    # -severity orders by rank, q= searches issue and remediation text
+    serializer = select_fields(security_issue_rows, fields)
+    query = findings_list_query(
+        current_user.id,
+        {"severity": severity, "platform": platform, "status": status},
+        ranges={"created_at": (created_after, created_before)},
+        search=q
+    )
+    return await list_findings(reads().security_issues, query, serializer, SECURITY_ISSUE_SORTS, sort, after, limit)
 
-@app.post("/api/security/scan", response_model=dict)
+@router.post("/api/security/scan", response_model=dict)
 async def scan_security(
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_active_user)
+    full: bool = False,
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    scan_id = str(uuid.uuid4())
-    
-    # Add background task to scan for security issues
-    background_tasks.add_task(scan_security_issues, current_user.id, scan_id)
+    # Queue the security scan for a worker; full=true re-evaluates every resource
+    scan_id = await enqueue_scan(db, current_user.id, "security", {"full": full})
     
     return {
         "status": "success",
-        "message": "Security scan started",
+        "message": "Security scan queued",
         "scan_id": scan_id
     }
 
-@app.post("/api/security/issues/{issue_id}/remediate", response_model=dict)
+@router.post("/api/security/issues/{issue_id}/remediate", response_model=dict)
 async def remediate_security_issue(
     issue_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    result = await db.security_issues.update_one(
-        {"_id": issue_id, "user_id": current_user.id},
-        {"$set": {"status": "remediated", "updated_at": datetime.utcnow()}}
+    # Return the previous state so the summary is only adjusted for issues that were open
+    previous = await db.security_issues.find_one_and_update(
+        {"_id": as_object_id(issue_id), "user_id": current_user.id, "status": {"$ne": "remediated"}},
+        {"$set": {"status": "remediated", "updated_at": datetime.utcnow()}},
+        projection={"severity": 1, "status": 1}
     )
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Security issue not found",
         )
     
+    if previous.get("status") == "open":
+        await apply_summary_delta(db, current_user.id, security_deltas([previous], sign=-1))
+    await bump_data_version(db, current_user.id)
+    
     return {
         "status": "success",
         "message": "Security issue remediated successfully"
     }
 
-async def scan_security_issues(user_id: str, scan_id: str):
-    # This would be a long-running task to scan for security issues
-    # For demonstration, we'll just create some sample issues
+@router.post("/api/security/issues/remediate", response_model=dict)
+async def bulk_remediate_security_issues(
+    request: BulkActionRequest,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    return await run_bulk_action("remediate", request, current_user.id)
+
+async def scan_security_issues(user_id: str, scan_id: str, full: bool = False):
+    # Stream the resources that changed since the last security scan through the
+    # rule registry, one batch at a time, upserting each batch with a single bulk write.
+    # Findings of unchanged resources carry forward untouched.
+    version = security_rules.version()
+    watermark = None if full else await get_watermark(db, user_id, "security", version)
+    resources = ChangeTracker(db.resources.find(
+        changed_resources_query(user_id, watermark),
+        projection={"id": 1, "platform": 1, "type": 1, "tags": 1, "stale": 1, "changed_at": 1}
+    ).batch_size(SCAN_BATCH_SIZE))
+    progress = ScanProgress(db, scan_id, "security")
+    await progress.start()
     
-    # Get resources for this user
-    resources = []
-    cursor = db.resources.find({"user_id": user_id})
-    async for document in cursor:
-        resources.append(document)
-    
-    # Sample security issues
-    sample_issues = []
-    
-    for resource in resources:
-        # AWS security issues
-        if resource["platform"] == "aws":
-            if resource["type"] == "t3.micro":
-                sample_issues.append({
-                    "user_id": user_id,
-                    "resource_id": resource["id"],
-                    "resource_type": "EC2 Instance",
-                    "platform": "aws",
-                    "severity": "high",
-                    "issue": "Security group allows SSH from any IP",
-                    "remediation": "Restrict SSH access to specific IP ranges",
-                    "compliance": ["CIS AWS 4.1", "NIST 800-53"],
-                    "status": "open",
-                    "created_at": datetime.utcnow()
-                })
-        
-        # Azure security issues
-        if resource["platform"] == "azure":
-            sample_issues.append({
-                "user_id": user_id,
-                "resource_id": resource["id"],
-                "resource_type": "Azure VM",
-                "platform": "azure",
-                "severity": "medium",
-                "issue": "Disk encryption not enabled",
-                "remediation": "Enable Azure Disk Encryption for the VM",
-                "compliance": ["CIS Azure 7.2", "NIST 800-53"],
-                "status": "open",
-                "created_at": datetime.utcnow()
-            })
-        
-        # GCP security issues
-        if resource["platform"] == "gcp":
-            sample_issues.append({
-                "user_id": user_id,
-                "resource_id": resource["id"],
-                "resource_type": "GCP VM Instance",
-                "platform": "gcp",
-                "severity": "medium",
-                "issue": "Instance has public IP without firewall protection",
-                "remediation": "Configure firewall rules to restrict access",
-                "compliance": ["CIS GCP 4.3", "NIST 800-53"],
-                "status": "open",
-                "created_at": datetime.utcnow()
-            })
+    async for findings, evaluated in evaluate_in_batches(resources, user_id, SCAN_BATCH_SIZE):
+        deltas = await sync_findings(
+            db.security_issues, user_id, scan_id, evaluated, findings, security_deltas, {"severity": 1}
+        )
+        await apply_summary_delta(db, user_id, deltas)
+        await bump_data_version(db, user_id)
+        await progress.advance(len(evaluated), len(findings))
     
-    # Insert security issues into database
-    if sample_issues:
-        await db.security_issues.insert_many(sample_issues)
-        print(f"Added {len(sample_issues)} sample security issues for user {user_id}")
+    await set_watermark(db, user_id, "security", version, resources.watermark(progress.started_at))
+    log.info("Security scan finished", extra={
+        "user_id": user_id,
+        "scan_id": scan_id,
+        "mode": "incremental" if watermark else "full",
+        "resources": progress.processed,
+        "issues": progress.findings,
+        "duration_ms": progress.elapsed_ms
+    })
 
 # Cost routes
-@app.get("/api/costs/recommendations", response_model=dict)
+@router.get("/api/costs/recommendations", response_model=dict)
 async def get_cost_recommendations(
     impact: Optional[str] = None,
     platform: Optional[str] = None,
     status: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user)
+    min_savings: Optional[float] = None,
+    max_savings: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    sort: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    # Build query
-    query = {"user_id": current_user.id}
-    if impact:
-        query["impact"] = impact
-    if platform:
-        query["platform"] = platform
-    if status:
-        query["status"] = status
-    
-    recommendations = []
-    cursor = db.cost_recommendations.find(query)
-    async for document in cursor:
-        document["id"] = str(document.pop("_id"))
-        recommendations.append(CostRecommendation(**document))
-    
-    return {
-        "status": "success",
-        "results": len(recommendations),
-        "data": recommendations
-    }
+    # impact/platform/status accept comma separated values; sort=-estimated_savings
+    # lists the biggest savings first, q= searches the justification text
+    serializer = select_fields(cost_recommendation_rows, fields)
+    query = findings_list_query(
+        current_user.id,
+        {"impact": impact, "platform": platform, "status": status},
+        ranges={
+            "estimated_savings": (min_savings, max_savings),
+            "created_at": (created_after, created_before),
+        },
+        search=q
+    )
+    return await list_findings(
+        reads().cost_recommendations, query, serializer, COST_RECOMMENDATION_SORTS, sort, after, limit
+    )
 
-@app.post("/api/costs/scan", response_model=dict)
+@router.post("/api/costs/scan", response_model=dict)
 async def scan_costs(
-    background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_active_user)
+    full: bool = False,
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    scan_id = str(uuid.uuid4())
-    
-    # Add background task to scan for cost optimizations
-    background_tasks.add_task(scan_cost_optimizations, current_user.id, scan_id)
+    # Queue the cost optimization scan for a worker; full=true re-prices every resource
+    scan_id = await enqueue_scan(db, current_user.id, "costs", {"full": full})
     
     return {
         "status": "success",
-        "message": "Cost optimization scan started",
+        "message": "Cost optimization scan queued",
         "scan_id": scan_id
     }
 
-@app.post("/api/costs/recommendations/{recommendation_id}/apply", response_model=dict)
+@router.post("/api/costs/recommendations/{recommendation_id}/apply", response_model=dict)
 async def apply_cost_recommendation(
     recommendation_id: str,
-    current_user: User = Depends(get_current_active_user)
+    current_user: TokenClaims = Depends(get_current_claims)
 ):
-    result = await db.cost_recommendations.update_one(
-        {"_id": recommendation_id, "user_id": current_user.id},
-        {"$set": {"status": "applied", "updated_at": datetime.utcnow()}}
+    # Return the previous state so the summary is only adjusted for open recommendations
+    previous = await db.cost_recommendations.find_one_and_update(
+        {"_id": as_object_id(recommendation_id), "user_id": current_user.id, "status": {"$ne": "applied"}},
+        {"$set": {"status": "applied", "updated_at": datetime.utcnow()}},
+        projection={"estimated_savings": 1, "status": 1}
     )
     
-    if result.modified_count == 0:
+    if previous is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cost recommendation not found",
         )
     
+    if previous.get("status") == "open":
+        await apply_summary_delta(db, current_user.id, cost_deltas([previous], sign=-1))
+    await bump_data_version(db, current_user.id)
+    
     return {
         "status": "success",
         "message": "Recommendation applied successfully"
     }
 
-async def scan_cost_optimizations(user_id: str, scan_id: str):
-    # This would be a long-running task to scan for cost optimizations
-    # For demonstration, we'll just create some sample recommendations
+@router.post("/api/costs/recommendations/apply", response_model=dict)
+async def bulk_apply_cost_recommendations(
+    request: BulkActionRequest,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    return await run_bulk_action("apply", request, current_user.id)
+
+async def scan_cost_optimizations(user_id: str, scan_id: str, full: bool = False):
+    # Price the resources that changed since the last cost scan against the local
+    # catalog, one batch per vectorized pass
+    catalog = get_pricing_catalog()
+    watermark = None if full else await get_watermark(db, user_id, "costs", catalog.version)
+    resources = ChangeTracker(db.resources.find(
+        changed_resources_query(user_id, watermark),
+        projection={"id": 1, "platform": 1, "type": 1, "region": 1, "zone": 1, "stale": 1, "changed_at": 1}
+    ).batch_size(SCAN_BATCH_SIZE))
+    progress = ScanProgress(db, scan_id, "costs")
+    await progress.start()
     
-    # Get resources for this user
-    resources = []
-    cursor = db.resources.find({"user_id": user_id})
-    async for document in cursor:
-        resources.append(document)
-    
-    # Sample cost recommendations
-    sample_recommendations = []
-    
-    for resource in resources:
-        # AWS cost recommendations
-        if resource["platform"] == "aws" and resource["type"] == "t3.micro":
-            sample_recommendations.append({
-                "user_id": user_id,
-                "resource_id": resource["id"],
-                "resource_type": "EC2 Instance",
-                "platform": "aws",
-                "current_configuration": "t3.micro, On-Demand",
-                "recommended_configuration": "t3.micro, Reserved Instance, 1 year",
-                "estimated_savings": 120.45,
-                "estimated_savings_percentage": 40,
-                "impact": "medium",
-                "justification": "Instance has been running constantly for 30+ days. Reserved Instance would reduce cost.",
-                "status": "open",
-                "created_at": datetime.utcnow()
-            })
-        
-        # Azure cost recommendations
-        if resource["platform"] == "azure" and resource["type"] == "Standard_B2s":
-            sample_recommendations.append({
-                "user_id": user_id,
-                "resource_id": resource["id"],
-                "resource_type": "Azure VM",
-                "platform": "azure",
-                "current_configuration": "Standard_B2s, Pay-As-You-Go",
-                "recommended_configuration": "Standard_B1s, Pay-As-You-Go",
-                "estimated_savings": 67.80,
-                "estimated_savings_percentage": 35,
-                "impact": "medium",
-                "justification": "VM is consistently underutilized. Downsizing would maintain performance while reducing cost.",
-                "status": "open",
-                "created_at": datetime.utcnow()
-            })
-        
-        # GCP cost recommendations
-        if resource["platform"] == "gcp" and resource["type"] == "e2-medium":
-            sample_recommendations.append({
-                "user_id": user_id,
-                "resource_id": resource["id"],
-                "resource_type": "GCP VM Instance",
-                "platform": "gcp",
-                "current_configuration": "e2-medium, On-Demand",
-                "recommended_configuration": "e2-small, Committed Use, 1 year",
-                "estimated_savings": 91.25,
-                "estimated_savings_percentage": 45,
-                "impact": "high",
-                "justification": "Instance has low CPU utilization. Downsizing and using committed use would reduce cost significantly.",
-                "status": "open",
-                "created_at": datetime.utcnow()
-            })
+    batch = []
+    async for resource in resources:
+        batch.append(resource)
+        if len(batch) >= SCAN_BATCH_SIZE:
+            await store_cost_recommendations(user_id, catalog, batch, progress)
+            batch = []
+    if batch:
+        await store_cost_recommendations(user_id, catalog, batch, progress)
     
-    # Insert cost recommendations into database
-    if sample_recommendations:
-        await db.cost_recommendations.insert_many(sample_recommendations)
-        print(f"Added {len(sample_recommendations)} sample cost recommendations for user {user_id}")
+    await set_watermark(db, user_id, "costs", catalog.version, resources.watermark(progress.started_at))
+    log.info("Cost scan finished", extra={
+        "user_id": user_id,
+        "scan_id": scan_id,
+        "mode": "incremental" if watermark else "full",
+        "resources": progress.processed,
+        "recommendations": progress.findings,
+        "duration_ms": progress.elapsed_ms
+    })
 
-# Dashboard summary
-@app.get("/api/dashboard/summary", response_model=dict)
-async def get_dashboard_summary(current_user: User = Depends(get_current_active_user)):
-    user_id = current_user.id
+async def store_cost_recommendations(user_id: str, catalog, resources: List[Dict[str, Any]], progress: ScanProgress):
+    # Stale resources get no recommendations, which resolves any they had
+    recommendations = catalog.recommend(user_id, [r for r in resources if not r.get("stale")])
+    deltas = await sync_findings(
+        db.cost_recommendations, user_id, progress.scan_id, [r["id"] for r in resources],
+        recommendations, cost_deltas, {"estimated_savings": 1}
+    )
+    await apply_summary_delta(db, user_id, deltas)
+    await bump_data_version(db, user_id)
+    await progress.advance(len(resources), len(recommendations))
+
+# Analytics routes
+@router.get("/api/analytics/costs", response_model=dict)
+async def get_cost_analytics(
+    impact: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    # Savings by platform, region, impact and resource type in one round trip
+    match = findings_match(current_user.id, impact=impact, platform=platform, status=status)
+    return {
+        "status": "success",
+        "data": await cost_breakdown(reads(), match)
+    }
+
+@router.get("/api/analytics/security", response_model=dict)
+async def get_security_analytics(
+    severity: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    # Issue counts by severity, platform, resource type and severity x compliance framework
+    match = findings_match(current_user.id, severity=severity, platform=platform, status=status)
+    return {
+        "status": "success",
+        "data": await security_breakdown(reads(), match)
+    }
+
+@router.get("/api/analytics/costs/trends", response_model=dict)
+async def get_cost_trends(
+    bucket: str = Query("day", pattern=f"^({'|'.join(TREND_BUCKETS)})$"),
+    days: int = Query(30, ge=1, le=MAX_TREND_DAYS),
+    impact: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    match = findings_match(current_user.id, impact=impact, platform=platform, status=status)
+    return {
+        "status": "success",
+        "bucket": bucket,
+        "data": await findings_trend(reads().cost_recommendations, match, bucket, days, savings=True)
+    }
+
+@router.get("/api/analytics/security/trends", response_model=dict)
+async def get_security_trends(
+    bucket: str = Query("day", pattern=f"^({'|'.join(TREND_BUCKETS)})$"),
+    days: int = Query(30, ge=1, le=MAX_TREND_DAYS),
+    severity: Optional[str] = None,
+    platform: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    match = findings_match(current_user.id, severity=severity, platform=platform, status=status)
+    return {
+        "status": "success",
+        "bucket": bucket,
+        "data": await findings_trend(reads().security_issues, match, bucket, days)
+    }
+
+@router.get("/api/analytics/snapshots", response_model=dict)
+async def get_snapshot_history(
+    days: int = Query(90, ge=1, le=MAX_SNAPSHOT_DAYS),
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    # Daily rollups written by the snapshot job; one indexed range read on (user_id, day)
+    snapshots = await get_snapshots(reads(), current_user.id, days)
+    return {
+        "status": "success",
+        "results": len(snapshots),
+        "data": snapshots
+    }
+
+# Bulk actions
+async def run_bulk_action(action: str, request: BulkActionRequest, user_id: str):
+    # Only filters the action supports count, so an unsupported one cannot select everything
+    filters = {
+        field: value for field, value in request.dict(exclude={"ids"}, exclude_none=True).items()
+        if field in BULK_ACTIONS[action]["filters"]
+    }
+    if request.ids is None and not filters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide finding ids or at least one filter",
+        )
+    if request.ids is not None and len(request.ids) > BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_MAX_IDS} ids per request",
+        )
+    
+    # Large selections are handed to a worker and tracked like a scan
+    query = bulk_query(action, user_id, request.ids, filters)
+    matched = await count_bulk_targets(db, action, query)
+    if matched > BULK_SYNC_LIMIT:
+        job_id = await enqueue_scan(db, user_id, "bulk", {"action": action, "ids": request.ids, "filters": filters})
+        return {
+            "status": "success",
+            "message": f"Bulk {action} of {matched} findings queued",
+            "matched": matched,
+            "scan_id": job_id
+        }
+    
+    updated = await apply_bulk_action(db, action, user_id, query)
+    response = {
+        "status": "success",
+        "matched": matched,
+        "updated": len(updated)
+    }
+    if request.ids is not None:
+        already = await already_in_status(db, action, user_id, request.ids)
+        response["results"] = bulk_item_results(request.ids, updated, already)
+    else:
+        response["ids"] = updated
+    return response
+
+async def run_bulk_job(
+    user_id: str,
+    scan_id: str,
+    action: str,
+    ids: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None
+):
+    progress = ScanProgress(db, scan_id, "bulk")
+    await progress.start()
+    
+    async def advance(modified: int):
+        await progress.advance(modified)
+    
+    await apply_bulk_action(db, action, user_id, bulk_query(action, user_id, ids, filters), on_batch=advance)
+    log.info("Bulk action finished", extra={
+        "user_id": user_id,
+        "scan_id": scan_id,
+        "action": action,
+        "updated": progress.processed,
+        "duration_ms": progress.elapsed_ms
+    })
+
+# Exports
+# collection -> row shape and the list route filters it accepts
+EXPORTS = {
+    "resources": {"rows": resource_rows, "filters": ("platform", "region", "type")},
+    "security_issues": {"rows": security_issue_rows, "filters": ("severity", "platform", "status")},
+    "cost_recommendations": {"rows": cost_recommendation_rows, "filters": ("impact", "platform", "status")},
+}
+
+@router.get("/api/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = Query("csv", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    platform: Optional[str] = None,
+    region: Optional[str] = None,
+    type: Optional[str] = None,
+    include_stale: bool = False,
+    severity: Optional[str] = None,
+    impact: Optional[str] = None,
+    status: Optional[str] = None,
+    min_savings: Optional[float] = None,
+    max_savings: Optional[float] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    q: Optional[str] = Query(None, max_length=200),
+    fields: Optional[str] = None,
+    current_user: TokenClaims = Depends(get_current_claims)
+):
+    # Streams straight from the cursor with chunked transfer encoding; nothing is buffered
+    # beyond one batch. Filters are those of the matching list route.
+    spec = EXPORTS.get(collection)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export {collection!r}; expected one of {', '.join(EXPORTS)}")
+    if format == "parquet" and pq is None:
+        raise HTTPException(status_code=501, detail="Parquet export is not available on this server (pyarrow is not installed)")
     
-    # Get resource counts
-    resource_count = await db.resources.count_documents({"user_id": user_id})
-    
-    # Get security issues by severity
-    security_pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {
-            "_id": "$severity",
-            "count": {"$sum": 1}
-        }}
-    ]
-    security_cursor = db.security_issues.aggregate(security_pipeline)
-    security_by_severity = {}
-    async for doc in security_cursor:
-        security_by_severity[doc["_id"]] = doc["count"]
-    
-    # Get cost savings
-    cost_pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {
-            "_id": None,
-            "total_savings": {"$sum": "$estimated_savings"}
-        }}
-    ]
-    cost_cursor = db.cost_recommendations.aggregate(cost_pipeline)
-    total_savings = 0
-    async for doc in cost_cursor:
-        total_savings = doc["total_savings"]
-    
-    # Get resource counts by platform
-    platform_pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {
-            "_id": "$platform",
-            "count": {"$sum": 1}
-        }}
-    ]
-    platform_cursor = db.resources.aggregate(platform_pipeline)
-    resources_by_platform = {}
-    async for doc in platform_cursor:
-        resources_by_platform[doc["_id"]] = doc["count"]
+    values = {
+        "platform": platform, "region": region, "type": type,
+        "severity": severity, "impact": impact, "status": status,
+    }
+    unsupported = [name for name, value in values.items() if value and name not in spec["filters"]]
+    if collection != "cost_recommendations" and (min_savings is not None or max_savings is not None):
+        unsupported.append("min_savings/max_savings")
+    if collection == "resources" and q:
+        unsupported.append("q")
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Filters not supported for {collection}: {', '.join(unsupported)}")
     
+    query = findings_list_query(
+        current_user.id,
+        {name: values[name] for name in spec["filters"]},
+        ranges={
+            "estimated_savings": (min_savings, max_savings),
+            "created_at": (created_after, created_before),
+        },
+        search=q
+    )
+    if collection == "resources" and not include_stale:
+        query["stale"] = {"$ne": True}
+    serializer = select_fields(spec["rows"], fields)
+    
+    cursor = reads()[collection].find(query, projection=serializer.projection)
+    return StreamingResponse(
+        export_stream(format, cursor, serializer),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(collection, format)}"'}
+    )
+
+# Dashboard summary
+@router.get("/api/dashboard/summary", response_model=dict)
+async def get_dashboard_summary(current_user: TokenClaims = Depends(get_current_claims)):
+    # Single point read of the materialized per-user summary
     return {
         "status": "success",
-        "data": {
-            "resources": {
-                "total": resource_count,
-                "by_platform": resources_by_platform
-            },
-            "security": {
-                "total": sum(security_by_severity.values()),
-                "by_severity": security_by_severity
-            },
-            "costs": {
-                "estimated_savings": total_savings,
-                "recommendations": await db.cost_recommendations.count_documents({"user_id": user_id})
-            },
-            "latest_scan": await db.scans.find_one(
-                {"user_id": user_id},
-                sort=[("end_time", -1)]
-            )
-        }
+        "data": await get_summary(db, current_user.id, read_db=reads())
     }
 
+@router.post("/api/dashboard/summary/recompute", response_model=dict)
+async def recompute_dashboard_summary(current_user: TokenClaims = Depends(get_current_claims)):
+    # Repair path: rebuild the summary from the raw collections
+    await recompute_summary(db, current_user.id)
+    await bump_data_version(db, current_user.id)
+    return {
+        "status": "success",
+        "data": await get_summary(db, current_user.id)
+    }
+
+# Prometheus metrics
+@router.get("/metrics")
+async def metrics():
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
+
 # Health check
-@app.get("/health")
+@router.get("/health")
 async def health_check():
     # Check MongoDB connection
     try:
@@ -838,10 +1358,47 @@ async def health_check():
         "status": "healthy",
         "version": "0.1.0",
         "environment": os.getenv("NODE_ENV", "development"),
-        "database": db_status
+        "database": db_status,
+        "auth_cache": user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "response_cache": response_cache.stats() if response_cache else None
     }
 
-# Run the application
+# Application factory
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="SpearPoint API",
+        description="SpearPoint Cloud Governance Platform API",
+        version="0.1.0",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        openapi_url="/api/openapi.json",
+        lifespan=lifespan
+    )
+    app.include_router(router)
+    
+    # Middleware added last runs first: CORS wraps everything so cached and 304
+    # responses carry CORS headers, and metrics time the conditional GET path too
+    app.middleware("http")(conditional_get)
+    app.middleware("http")(log_requests)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=os.getenv("CORS_ORIGIN", "http://localhost:3000").split(","),
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    app.add_exception_handler(HTTPException, http_exception_handler)
+    app.add_exception_handler(HasherBusy, hasher_busy_handler)
+    app.add_exception_handler(WaitQueueTimeoutError, pool_exhausted_handler)
+    app.add_exception_handler(Exception, general_exception_handler)
+    return app
+
+# Module-level app for uvicorn/gunicorn ("app.main:app"); nothing connects until the lifespan runs
+app = create_app()
+
+# Run the application (development server; production uses gunicorn.conf.py)
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=int(os.getenv("PORT", "3001")), reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=int(os.getenv("PORT", "3001")), reload=True)
\ No newline at end of file
@@ -0,0 +1,215 @@
+# app/metrics.py
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import time
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from pymongo import monitoring
+from starlette.routing import BaseRoute, Match
+
+from .logs import DroppingQueueHandler
+
+# Prometheus metrics for the API and the scan worker. The API serves them on
+# /metrics; the worker, which has no HTTP server of its own, starts a
+# prometheus_client exporter on WORKER_METRICS_PORT.
+#
+# Under gunicorn each API worker is a separate process; with PROMETHEUS_MULTIPROC_DIR
+# set, prometheus_client keeps metric values in files there and /metrics merges
+# the values of every live worker, whichever worker serves the scrape.
+
+# A missing directory would make the first labelled metric update raise
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Latency buckets in seconds, from a cached point read up to a slow export
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "spearpoint_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "spearpoint_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "spearpoint_mongo_command_duration_seconds",
+    "MongoDB command latency as reported by pymongo command monitoring",
+    ["command", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "spearpoint_mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled MongoDB connection",
+    ["address", "outcome"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+MONGO_POOL_CONNECTIONS = Gauge(
+    "spearpoint_mongo_pool_connections",
+    "Pooled MongoDB connections by state",
+    ["address", "state"],
+    multiprocess_mode="livesum",
+)
+SCAN_ITEMS_PROCESSED = Counter(
+    "spearpoint_scan_items_processed_total",
+    "Resources (or findings, for bulk jobs) processed by scan jobs",
+    ["kind"],
+)
+SCAN_FINDINGS = Counter(
+    "spearpoint_scan_findings_total",
+    "Findings reported by scan jobs",
+    ["kind"],
+)
+SCAN_JOBS = Counter(
+    "spearpoint_scan_jobs_total",
+    "Scan jobs finished by the worker",
+    ["kind", "outcome"],
+)
+SCAN_JOB_DURATION = Histogram(
+    "spearpoint_scan_job_duration_seconds",
+    "Wall time of scan jobs run by the worker",
+    ["kind"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+
+def route_template(routes: Iterable[BaseRoute], scope: Dict[str, Any]) -> str:
+    """The matched route's path template, so /api/scans/{scan_id} is one series rather than one per id."""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or "unmatched"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener recording every command's server round trip."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "succeeded").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "failed").observe(event.duration_micros / 1e6)
+
+
+def _address(address) -> str:
+    host, port = address
+    return f"{host}:{port}"
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """pymongo pool listener recording checkout waits and open/in-use connections per server.
+
+    A checkout's started and finished events are published on the thread that
+    performs it, so the start time is kept in a thread local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _waited(self, address) -> float:
+        started = getattr(self._local, "started", {}).pop(address, None)
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        if not hasattr(self._local, "started"):
+            self._local.started = {}
+        self._local.started[event.address] = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        address = _address(event.address)
+        MONGO_POOL_CHECKOUT_WAIT.labels(address, "succeeded").observe(self._waited(event.address))
+        MONGO_POOL_CONNECTIONS.labels(address, "in_use").inc()
+
+    def connection_check_out_failed(self, event):
+        # reason is "timeout" when the wait queue timeout expired
+        MONGO_POOL_CHECKOUT_WAIT.labels(_address(event.address), event.reason).observe(self._waited(event.address))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event.address), "in_use").dec()
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event.address), "open").inc()
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.labels(_address(event.address), "open").dec()
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+class StatsCollector:
+    """Exposes a component's stats() dict (cache hits, pool queue depth, ...) at scrape time.
+
+    Keys listed in `counters` become counters, every other numeric key a gauge.
+    """
+
+    def __init__(self, name: str, stats: Callable[[], Optional[Dict[str, Any]]], counters: Iterable[str] = ()):
+        self.name = name
+        self.stats = stats
+        self.counters = set(counters)
+
+    def collect(self):
+        stats = self.stats() or {}
+        for key, value in stats.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            metric_name = f"spearpoint_{self.name}_{key}"
+            if key in self.counters:
+                family = CounterMetricFamily(metric_name, f"{self.name} {key}")
+            else:
+                family = GaugeMetricFamily(metric_name, f"{self.name} {key}")
+            family.add_metric([], value)
+            yield family
+
+
+_stats_collectors: List[StatsCollector] = []
+
+
+def register_stats(name: str, stats: Callable[[], Optional[Dict[str, Any]]], counters: Iterable[str] = ()) -> None:
+    collector = StatsCollector(name, stats, counters)
+    _stats_collectors.append(collector)
+    REGISTRY.register(collector)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """The /metrics body and content type.
+
+    In multiprocess mode the registered metrics are merged across workers;
+    component stats are read live and so describe the worker that served the scrape.
+    """
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in _stats_collectors:
+        registry.register(collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+register_stats("log_records", lambda: {"dropped": DroppingQueueHandler.dropped}, counters=["dropped"])
@@ -0,0 +1,101 @@
+# app/pagination.py
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from bson import ObjectId
+import base64
+import json
+
+# Default and maximum page sizes for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Keyset order used by every paginated list: creation time, then _id as tie-breaker
+KEYSET_SORT = [("created_at", 1), ("_id", 1)]
+
+
+def keyset_sort(field: str = "created_at", descending: bool = False) -> List[Tuple[str, int]]:
+    """Keyset order on `field`, with _id as tie-breaker in the same direction."""
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def parse_sort(sort: Optional[str], allowed: Dict[str, str], default: str = "created_at") -> Tuple[str, bool]:
+    """Turn `sort=name` or `sort=-name` into (document field, descending).
+
+    `allowed` maps the public sort names to the fields they sort on. Raises
+    ValueError for anything else.
+    """
+    if not sort:
+        return allowed[default], False
+    descending = sort.startswith("-")
+    name = sort[1:] if descending else sort
+    if name not in allowed:
+        raise ValueError(f"Cannot sort by {name!r}; expected one of {', '.join(allowed)}")
+    return allowed[name], descending
+
+
+def encode_cursor(document: Dict[str, Any], field: str = "created_at", descending: bool = False) -> str:
+    """Build an opaque `after` cursor from the last document of a page."""
+    value = document.get(field)
+    doc_id = document["_id"]
+    payload: Dict[str, Any] = {
+        "t": value.isoformat() if isinstance(value, datetime) else None,
+        "i": str(doc_id),
+        "o": isinstance(doc_id, ObjectId),
+    }
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        payload["n"] = value
+    # Cursors for the default order stay as short as before
+    if field != "created_at" or descending:
+        payload["f"] = field
+        payload["d"] = descending
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str = "created_at", descending: bool = False) -> Dict[str, Any]:
+    """Turn an `after` cursor back into a query fragment that selects the next page."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        doc_id = ObjectId(payload["i"]) if payload.get("o") else payload["i"]
+        if payload.get("t"):
+            value = datetime.fromisoformat(payload["t"])
+        else:
+            value = payload.get("n")
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid pagination cursor")
+    if payload.get("f", "created_at") != field or bool(payload.get("d")) != descending:
+        raise ValueError("Pagination cursor does not match the requested sort")
+
+    # Documents without a value sort before the rest ascending and after them descending
+    if descending:
+        if value is None:
+            return {field: None, "_id": {"$lt": doc_id}}
+        return {"$or": [
+            {field: {"$lt": value}},
+            {field: value, "_id": {"$lt": doc_id}},
+            {field: None},
+        ]}
+    # A null cursor continues with the remaining undated documents and then every dated one
+    later = {"$ne": None} if value is None else {"$gt": value}
+    return {"$or": [
+        {field: later},
+        {field: value, "_id": {"$gt": doc_id}},
+    ]}
+
+
+def apply_cursor(
+    query: Dict[str, Any],
+    after: Optional[str],
+    field: str = "created_at",
+    descending: bool = False
+) -> Dict[str, Any]:
+    """Return `query` narrowed to documents that come after the given cursor."""
+    if not after:
+        return query
+    return {"$and": [query, decode_cursor(after, field, descending)]}
+
+
+def wants_ndjson(accept: Optional[str]) -> bool:
+    return bool(accept) and "application/x-ndjson" in accept
@@ -0,0 +1,116 @@
+# app/pricing.py
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import json
+import os
+import numpy as np
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "pricing_catalog.json")
+
+
+class PricingCatalog:
+    """Local SKU price list plus rightsizing entries, held in NumPy arrays.
+
+    Each rightsizing entry maps a (platform, sku) to a recommended sku and a
+    pricing-model discount (reserved/committed use). recommend() resolves a
+    whole batch of resources to array indices and computes every saving in a
+    single vectorized pass.
+    """
+
+    def __init__(self, catalog: Dict[str, Any]):
+        # Changes to prices or rightsizing entries invalidate incremental cost scans
+        self.version = hashlib.sha1(json.dumps(catalog, sort_keys=True).encode()).hexdigest()
+        self.currency = catalog.get("currency", "USD")
+        self.hours_per_month = float(catalog.get("hours_per_month", 730))
+        self.default_regions = catalog.get("default_regions", {})
+
+        skus = catalog["skus"]
+        self._price_index = {(s["platform"], s["region"], s["sku"]): i for i, s in enumerate(skus)}
+        self.hourly = np.array([s["hourly"] for s in skus], dtype=np.float64)
+
+        self.rules = catalog["rightsizing"]
+        self._rule_index = {(r["platform"], r["sku"]): i for i, r in enumerate(self.rules)}
+        self.discount = np.array([r.get("discount", 0.0) for r in self.rules], dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "PricingCatalog":
+        with open(path or DEFAULT_CATALOG_PATH) as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _region(resource: Dict[str, Any]) -> Optional[str]:
+        if resource.get("region"):
+            return resource["region"]
+        # GCP zonal resources only carry a zone such as us-central1-a
+        if resource.get("zone"):
+            return resource["zone"].rsplit("-", 1)[0]
+        return None
+
+    def _lookup(self, platform: str, region: Optional[str], sku: str) -> int:
+        index = self._price_index.get((platform, region, sku))
+        if index is None:
+            index = self._price_index.get((platform, self.default_regions.get(platform), sku))
+        return -1 if index is None else index
+
+    def recommend(
+        self,
+        user_id: str,
+        resources: List[Dict[str, Any]],
+        now: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Return cost recommendations for every resource in the batch that has a positive saving."""
+        now = now or datetime.utcnow()
+        count = len(resources)
+        rule_idx = np.full(count, -1, dtype=np.int64)
+        current_idx = np.full(count, -1, dtype=np.int64)
+        recommended_idx = np.full(count, -1, dtype=np.int64)
+
+        # Resolve each resource to catalog rows; everything after this is array math
+        for i, resource in enumerate(resources):
+            rule = self._rule_index.get((resource["platform"], resource["type"]))
+            if rule is None:
+                continue
+            region = self._region(resource)
+            rule_idx[i] = rule
+            current_idx[i] = self._lookup(resource["platform"], region, resource["type"])
+            recommended_idx[i] = self._lookup(resource["platform"], region, self.rules[rule]["recommended_sku"])
+
+        selected = np.nonzero((rule_idx >= 0) & (current_idx >= 0) & (recommended_idx >= 0))[0]
+        if selected.size == 0:
+            return []
+
+        current_hourly = self.hourly[current_idx[selected]]
+        recommended_hourly = self.hourly[recommended_idx[selected]] * (1.0 - self.discount[rule_idx[selected]])
+        savings = np.round((current_hourly - recommended_hourly) * self.hours_per_month, 2)
+        percentage = np.round(100.0 * (current_hourly - recommended_hourly) / current_hourly, 1)
+        positive = savings > 0
+
+        recommendations = []
+        for i, saving, pct in zip(selected[positive].tolist(), savings[positive].tolist(), percentage[positive].tolist()):
+            resource = resources[i]
+            rule = self.rules[rule_idx[i]]
+            recommendations.append({
+                "user_id": user_id,
+                "rule_id": rule["id"],
+                "resource_id": resource["id"],
+                "resource_type": rule["resource_label"],
+                "platform": resource["platform"],
+                "region": self._region(resource),
+                "current_configuration": rule["current_configuration"],
+                "recommended_configuration": rule["recommended_configuration"],
+                "estimated_savings": saving,
+                "estimated_savings_percentage": pct,
+                "currency": self.currency,
+                "impact": rule["impact"],
+                "justification": rule["justification"],
+                "status": "open",
+                "created_at": now
+            })
+        return recommendations
+
+
+@lru_cache(maxsize=1)
+def get_pricing_catalog() -> PricingCatalog:
+    return PricingCatalog.load(os.getenv("PRICING_CATALOG_PATH"))
@@ -0,0 +1,76 @@
+# app/progress.py
+from typing import Any, Dict, Optional
+from datetime import datetime
+import time
+
+from .metrics import SCAN_ITEMS_PROCESSED, SCAN_FINDINGS
+
+# Progress lives on the scan's scan_jobs document (keyed by scan_id), so the
+# status endpoint reads a single document for both queue state and progress.
+
+TERMINAL_STATES = ("completed", "failed")
+
+
+class ScanProgress:
+    """Tracks how far a running scan has got and persists it once per batch."""
+
+    def __init__(self, db, scan_id: str, kind: str = "unknown"):
+        self.db = db
+        self.scan_id = scan_id
+        self.kind = kind
+        self.processed = 0
+        self.findings = 0
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+
+    @property
+    def elapsed_ms(self) -> int:
+        return int((time.perf_counter() - self._started) * 1000)
+
+    async def start(self) -> None:
+        await self._save({"progress.started_at": self.started_at})
+
+    async def advance(self, processed: int, findings: int = 0) -> None:
+        self.processed += processed
+        self.findings += findings
+        SCAN_ITEMS_PROCESSED.labels(self.kind).inc(processed)
+        SCAN_FINDINGS.labels(self.kind).inc(findings)
+        await self._save()
+
+    async def _save(self, extra: Optional[Dict[str, Any]] = None) -> None:
+        fields = {
+            "progress.processed": self.processed,
+            "progress.findings": self.findings,
+            "progress.elapsed_ms": self.elapsed_ms,
+            "updated_at": datetime.utcnow()
+        }
+        fields.update(extra or {})
+        await self.db.scan_jobs.update_one({"_id": self.scan_id}, {"$set": fields})
+
+
+def scan_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a scan_jobs document into the public scan status payload."""
+    progress = job.get("progress", {})
+    processed = progress.get("processed", 0)
+    started_at = progress.get("started_at")
+    finished_at = job.get("finished_at") if job.get("status") in TERMINAL_STATES else None
+
+    if started_at:
+        elapsed_ms = int(((finished_at or datetime.utcnow()) - started_at).total_seconds() * 1000)
+    else:
+        elapsed_ms = 0
+
+    return {
+        "scan_id": job["_id"],
+        "kind": job.get("kind"),
+        "state": job.get("status"),
+        "attempts": job.get("attempts", 0),
+        "resources_processed": processed,
+        "findings": progress.get("findings", 0),
+        "elapsed_ms": elapsed_ms,
+        "throughput_per_sec": round(processed * 1000 / elapsed_ms, 2) if elapsed_ms else 0.0,
+        "created_at": job.get("created_at"),
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "error": job.get("error")
+    }
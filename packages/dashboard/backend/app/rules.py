@@ -0,0 +1,176 @@
+# app/rules.py
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from datetime import datetime
+import hashlib
+import json
+
+Resource = Dict[str, Any]
+
+# Numeric severity stored on each finding as severity_rank, so lists can sort by it
+SEVERITY_RANKS = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+
+class SecurityRule:
+    """A single security check applied to resources of one platform.
+
+    `resource_types` limits the rule to those resource types; None applies it to
+    every resource on the platform. `check` decides whether a matching resource
+    actually violates the rule and defaults to always reporting.
+    """
+
+    def __init__(
+        self,
+        rule_id: str,
+        platform: str,
+        resource_label: str,
+        severity: str,
+        issue: str,
+        remediation: str,
+        compliance: Optional[List[str]] = None,
+        resource_types: Optional[List[str]] = None,
+        check: Optional[Callable[[Resource], bool]] = None
+    ):
+        self.rule_id = rule_id
+        self.platform = platform
+        self.resource_label = resource_label
+        self.severity = severity
+        self.issue = issue
+        self.remediation = remediation
+        self.compliance = compliance or []
+        self.resource_types = resource_types
+        self.check = check or (lambda resource: True)
+
+    def definition(self) -> Dict[str, Any]:
+        """Everything that shapes the rule's findings except `check`, which is code and ships with a deploy."""
+        return {
+            "rule_id": self.rule_id,
+            "platform": self.platform,
+            "resource_label": self.resource_label,
+            "severity": self.severity,
+            "issue": self.issue,
+            "remediation": self.remediation,
+            "compliance": list(self.compliance),
+            "resource_types": self.resource_types,
+        }
+
+    def finding(self, user_id: str, resource: Resource, now: datetime) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "rule_id": self.rule_id,
+            "resource_id": resource["id"],
+            "resource_type": self.resource_label,
+            "platform": self.platform,
+            "severity": self.severity,
+            "severity_rank": SEVERITY_RANKS.get(self.severity, 0),
+            "issue": self.issue,
+            "remediation": self.remediation,
+            "compliance": list(self.compliance),
+            "status": "open",
+            "created_at": now
+        }
+
+
+class RuleRegistry:
+    """Security rules indexed by (platform, type) so each resource only meets the rules that apply to it."""
+
+    def __init__(self):
+        self._by_type: Dict[Tuple[str, Optional[str]], List[SecurityRule]] = defaultdict(list)
+        self._resolved: Dict[Tuple[str, str], List[SecurityRule]] = {}
+
+    def register(self, rule: SecurityRule) -> SecurityRule:
+        for resource_type in rule.resource_types or [None]:
+            self._by_type[(rule.platform, resource_type)].append(rule)
+        self._resolved.clear()
+        return rule
+
+    def rules_for(self, platform: str, resource_type: str) -> List[SecurityRule]:
+        key = (platform, resource_type)
+        rules = self._resolved.get(key)
+        if rules is None:
+            rules = self._by_type.get(key, []) + self._by_type.get((platform, None), [])
+            self._resolved[key] = rules
+        return rules
+
+    def all_rules(self) -> List[SecurityRule]:
+        """Every registered rule once, however many resource types it covers."""
+        return list({id(rule): rule for rules in self._by_type.values() for rule in rules}.values())
+
+    def version(self) -> str:
+        """Hash of every registered rule definition, used to invalidate incremental scan watermarks.
+
+        Any change to what a finding carries (remediation text, compliance tags,
+        ...) invalidates them, so the next scan rewrites every finding.
+        """
+        definitions = sorted((rule.definition() for rule in self.all_rules()), key=lambda d: d["rule_id"])
+        return hashlib.sha1(json.dumps(definitions, sort_keys=True).encode()).hexdigest()
+
+    def evaluate(self, user_id: str, resource: Resource, now: datetime) -> List[Dict[str, Any]]:
+        return [
+            rule.finding(user_id, resource, now)
+            for rule in self.rules_for(resource["platform"], resource["type"])
+            if rule.check(resource)
+        ]
+
+
+async def evaluate_in_batches(
+    cursor,
+    user_id: str,
+    batch_size: int,
+    registry: Optional[RuleRegistry] = None
+) -> AsyncIterator[Tuple[List[Dict[str, Any]], List[str]]]:
+    """Consume a resource cursor and yield (findings, evaluated resource ids) per batch.
+
+    Stale resources produce no findings but are still reported as evaluated so
+    their earlier findings can be closed. A batch closes after `batch_size`
+    resources or `batch_size` findings, whichever comes first.
+    """
+    registry = registry or security_rules
+    now = datetime.utcnow()
+    findings: List[Dict[str, Any]] = []
+    evaluated: List[str] = []
+    async for resource in cursor:
+        if not resource.get("stale"):
+            findings.extend(registry.evaluate(user_id, resource, now))
+        evaluated.append(resource["id"])
+        if len(evaluated) >= batch_size or len(findings) >= batch_size:
+            yield findings, evaluated
+            findings = []
+            evaluated = []
+    if findings or evaluated:
+        yield findings, evaluated
+
+
+# Default registry and built-in rules
+security_rules = RuleRegistry()
+
+security_rules.register(SecurityRule(
+    rule_id="aws-ec2-open-ssh",
+    platform="aws",
+    resource_types=["t3.micro"],
+    resource_label="EC2 Instance",
+    severity="high",
+    issue="Security group allows SSH from any IP",
+    remediation="Restrict SSH access to specific IP ranges",
+    compliance=["CIS AWS 4.1", "NIST 800-53"]
+))
+
+security_rules.register(SecurityRule(
+    rule_id="azure-vm-disk-encryption",
+    platform="azure",
+    resource_label="Azure VM",
+    severity="medium",
+    issue="Disk encryption not enabled",
+    remediation="Enable Azure Disk Encryption for the VM",
+    compliance=["CIS Azure 7.2", "NIST 800-53"]
+))
+
+security_rules.register(SecurityRule(
+    rule_id="gcp-vm-public-ip",
+    platform="gcp",
+    resource_label="GCP VM Instance",
+    severity="medium",
+    issue="Instance has public IP without firewall protection",
+    remediation="Configure firewall rules to restrict access",
+    compliance=["CIS GCP 4.3", "NIST 800-53"]
+))
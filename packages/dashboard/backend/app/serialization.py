@@ -0,0 +1,211 @@
+# app/serialization.py
+# Benchmark: python -m app.serialization [--rows N]
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+from datetime import datetime
+from bson import ObjectId
+from fastapi.responses import Response
+from pydantic import BaseModel
+import json
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
+
+# Fast path for list endpoints. Documents in resources, security_issues and
+# cost_recommendations are written only by our own scan code, so instead of
+# building a Pydantic model per row and letting FastAPI validate and encode the
+# result again, handlers fetch just the model's fields from Mongo, turn each
+# document into a plain row and encode the whole payload once. `id` is always
+# filled from `_id`.
+
+
+def _model_fields(model: Type[BaseModel]) -> Dict[str, Any]:
+    return getattr(model, "model_fields", None) or model.__fields__
+
+
+def model_field_types(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Declared type of each model field, e.g. Optional[List[str]]."""
+    return {
+        name: getattr(field, "annotation", None) or getattr(field, "outer_type_", None)
+        for name, field in _model_fields(model).items()
+    }
+
+
+class RowSerializer:
+    """Turns documents into response rows shaped like `model`, without validating them.
+
+    `fields` limits rows to a sparse fieldset of the model (id is always included).
+    `cursor_fields` are fetched for the keyset cursor even when the client did not
+    ask for them, and left out of the rows in that case.
+    """
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        fields: Optional[List[str]] = None,
+        cursor_fields: Tuple[str, ...] = ("created_at",)
+    ):
+        self.model = model
+        model_fields = _model_fields(model)
+        self.fields = ["id"] + [name for name in (fields or model_fields) if name != "id"]
+        self.cursor_fields = cursor_fields
+        self._requested = fields
+
+        self.projection = {name: 1 for name in self.fields if name != "id"}
+        self.projection["_id"] = 1
+        self.projection.update({name: 1 for name in cursor_fields})
+        self._drop = [name for name in cursor_fields if name not in self.fields]
+
+        # Optional fields absent from a document still appear in the row, as with the model
+        self.defaults = {}
+        for name in self.fields:
+            field = model_fields[name]
+            required = field.is_required() if hasattr(field, "is_required") else field.required
+            if not required:
+                self.defaults[name] = field.default
+        self._subsets: Dict[Tuple[str, ...], "RowSerializer"] = {}
+
+    def select(self, fields: Optional[str]) -> "RowSerializer":
+        """Serializer for a comma separated `fields=` parameter. Raises ValueError on unknown names."""
+        if not fields:
+            return self
+        names = tuple(sorted({name.strip() for name in fields.split(",") if name.strip()}))
+        unknown = [name for name in names if name not in _model_fields(self.model)]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if names not in self._subsets:
+            self._subsets[names] = RowSerializer(self.model, list(names), self.cursor_fields)
+        return self._subsets[names]
+
+    def sorted_by(self, field: str) -> "RowSerializer":
+        """Serializer that also fetches `field`, the sort key of a keyset cursor."""
+        if field in self.cursor_fields:
+            return self
+        key = ("sorted_by", field)
+        if key not in self._subsets:
+            self._subsets[key] = RowSerializer(self.model, self._requested, self.cursor_fields + (field,))
+        return self._subsets[key]
+
+    def row(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(self.defaults)
+        row.update(document)
+        row["id"] = str(row.pop("_id"))
+        for name in self._drop:
+            row.pop(name, None)
+        return row
+
+    def rows(self, documents: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.row(document) for document in documents]
+
+
+def as_object_id(value: str):
+    # Documents inserted by the API carry ObjectId keys; fall back to the raw string otherwise
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson when available. Returned directly from a
+    handler, it also bypasses FastAPI's response_model validation."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Rows encoded per chunk of a streamed list response
+STREAM_CHUNK_ROWS = 500
+
+
+async def stream_rows(cursor, serializer: RowSerializer) -> AsyncIterator[bytes]:
+    """The list payload of FastJSONResponse, encoded a chunk of rows at a time as they
+    come off the cursor. `results` follows the rows since the count is only known then."""
+    yield b'{"status":"success","data":['
+    count = 0
+    chunk: List[bytes] = []
+    async for document in cursor:
+        chunk.append(dumps(serializer.row(document)))
+        if len(chunk) >= STREAM_CHUNK_ROWS:
+            yield (b"," if count else b"") + b",".join(chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        yield (b"," if count else b"") + b",".join(chunk)
+        count += len(chunk)
+    yield b'],"results":' + str(count).encode() + b',"next_cursor":null}'
+
+
+if __name__ == "__main__":
+    # Compare the per-row model path with the fast path on synthetic issue documents
+    import argparse
+    import time
+    from fastapi.encoders import jsonable_encoder
+    from .main import SecurityIssue
+
+    parser = argparse.ArgumentParser(description="List response serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    documents = [{
+        "_id": ObjectId(),
+        "rule_id": "aws-ec2-open-ssh",
+        "resource_id": f"i-{i:08d}",
+        "resource_type": "EC2 Instance",
+        "platform": "aws",
+        "severity": "high",
+        "issue": "Security group allows SSH access from 0.0.0.0/0",
+        "remediation": "Restrict SSH access to specific IP addresses",
+        "compliance": ["CIS AWS 4.1", "NIST 800-53"],
+        "status": "open",
+        "first_seen": now,
+        "last_seen": now,
+        "created_at": now,
+    } for i in range(args.rows)]
+
+    def model_path():
+        issues = []
+        for document in documents:
+            document = dict(document)
+            document["id"] = str(document.pop("_id"))
+            issues.append(SecurityIssue(**document))
+        # What FastAPI does with a response_model=dict handler result
+        payload = jsonable_encoder({"status": "success", "results": len(issues), "data": issues})
+        return json.dumps(payload).encode()
+
+    serializer = RowSerializer(SecurityIssue)
+
+    def fast_path():
+        rows = serializer.rows(documents)
+        return FastJSONResponse({"status": "success", "results": len(rows), "data": rows}).body
+
+    def best_of(path):
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            path()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    for name, path in (("model", model_path), ("fast", fast_path)):
+        best = best_of(path)
+        print(f"{name:>5}: {args.rows / best:,.0f} rows/sec ({best * 1000:.1f} ms per {args.rows} rows)")
+    print(f"backend: {'orjson' if orjson is not None else 'json'}")
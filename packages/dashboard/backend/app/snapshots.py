@@ -0,0 +1,109 @@
+# app/snapshots.py
+# Daily per-tenant rollups: python -m app.snapshots snapshots every tenant for today
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+
+from .caching import bump_data_version
+from .logs import get_logger
+
+log = get_logger("snapshots")
+
+# One compact document per (user, UTC day) in `tenant_snapshots`, keyed
+# "<user_id>:<YYYY-MM-DD>". Re-running a snapshot on the same day overwrites
+# that day's document, so the job is safe to run as often as needed; the last
+# run of the day wins, and the tenant's data version is only bumped when the
+# counters changed. Trend reads are a single range scan on (user_id, day).
+
+MAX_SNAPSHOT_DAYS = 365
+
+
+def snapshot_day(when: Optional[datetime] = None) -> datetime:
+    when = when or datetime.utcnow()
+    return datetime(when.year, when.month, when.day)
+
+
+async def build_snapshot(db, user_id: str) -> Dict[str, Any]:
+    """Roll the tenant's current state up into snapshot counters."""
+    by_platform: Dict[str, int] = {}
+    by_type: Dict[str, int] = {}
+    async for doc in db.resources.aggregate([
+        {"$match": {"user_id": user_id, "stale": {"$ne": True}}},
+        {"$group": {"_id": {"platform": "$platform", "type": "$type"}, "count": {"$sum": 1}}}
+    ]):
+        platform = doc["_id"].get("platform")
+        by_platform[platform] = by_platform.get(platform, 0) + doc["count"]
+        by_type[f"{platform}:{doc['_id'].get('type')}"] = doc["count"]
+
+    by_severity: Dict[str, int] = {}
+    async for doc in db.security_issues.aggregate([
+        {"$match": {"user_id": user_id, "status": "open"}},
+        {"$group": {"_id": "$severity", "count": {"$sum": 1}}}
+    ]):
+        by_severity[doc["_id"]] = doc["count"]
+
+    costs = {"recommendations": 0, "estimated_savings": 0.0}
+    async for doc in db.cost_recommendations.aggregate([
+        {"$match": {"user_id": user_id, "status": "open"}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "savings": {"$sum": "$estimated_savings"}}}
+    ]):
+        costs = {"recommendations": doc["count"], "estimated_savings": round(doc["savings"] or 0, 2)}
+
+    return {
+        "resources": {"total": sum(by_platform.values()), "by_platform": by_platform, "by_type": by_type},
+        "security": {"open": sum(by_severity.values()), "by_severity": by_severity},
+        "costs": costs,
+    }
+
+
+async def take_snapshot(db, user_id: str, when: Optional[datetime] = None) -> Dict[str, Any]:
+    day = snapshot_day(when)
+    snapshot = await build_snapshot(db, user_id)
+    snapshot.update({"user_id": user_id, "day": day})
+    key = f"{user_id}:{day:%Y-%m-%d}"
+    stored = await db.tenant_snapshots.find_one({"_id": key}, projection={"taken_at": 0})
+    snapshot["taken_at"] = datetime.utcnow()
+    if stored is not None and {k: v for k, v in stored.items() if k != "_id"} == \
+            {k: v for k, v in snapshot.items() if k != "taken_at"}:
+        # Same counters as the last run today: cached trend responses are still current
+        await db.tenant_snapshots.update_one({"_id": key}, {"$set": {"taken_at": snapshot["taken_at"]}})
+        return snapshot
+    await db.tenant_snapshots.replace_one({"_id": key}, snapshot, upsert=True)
+    await bump_data_version(db, user_id)
+    return snapshot
+
+
+async def snapshot_all_tenants(db, when: Optional[datetime] = None) -> int:
+    """Snapshot every tenant with connected credentials. Returns the number taken."""
+    taken = 0
+    for user_id in await db.cloud_credentials.distinct("user_id"):
+        try:
+            await take_snapshot(db, user_id, when)
+            taken += 1
+        except Exception as e:
+            log.error("Snapshot failed", extra={"user_id": user_id, "error": str(e)})
+    return taken
+
+
+async def get_snapshots(db, user_id: str, days: int) -> List[Dict[str, Any]]:
+    """Daily snapshots for the last `days` days, oldest first."""
+    since = snapshot_day() - timedelta(days=days - 1)
+    cursor = db.tenant_snapshots.find(
+        {"user_id": user_id, "day": {"$gte": since}},
+        projection={"_id": 0, "user_id": 0, "taken_at": 0},
+        sort=[("day", 1)]
+    )
+    return [doc async for doc in cursor]
+
+
+if __name__ == "__main__":
+    import asyncio
+    from .database import DATABASE_NAME, create_client
+
+    async def main():
+        # Same connection settings as the API (TLS for DocumentDB, pool, DATABASE_NAME)
+        client = create_client()
+        taken = await snapshot_all_tenants(client[DATABASE_NAME])
+        print(f"Took {taken} tenant snapshots")
+        client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,179 @@
+# app/summary.py
+from typing import Any, Dict, Iterable, Optional
+from collections import Counter
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+
+# One document per user in `dashboard_summaries`, keyed by user_id in _id, so the
+# dashboard endpoint is a single point read. Writers keep it current with $inc
+# deltas; recompute_summary() rebuilds it from the source collections. Deltas
+# only ever update an existing summary: a missing one is built from the raw data
+# on first read, which already includes whatever the delta describes.
+#
+# Attempts recompute_summary() makes to rebuild without a concurrent delta
+RECOMPUTE_ATTEMPTS = 5
+
+# Security and cost figures cover open findings only, so remediating an issue or
+# applying a recommendation takes it out of the totals.
+
+
+def resource_count_deltas(by_platform: Dict[str, int]) -> Dict[str, float]:
+    deltas = {f"resources.by_platform.{platform}": count for platform, count in by_platform.items()}
+    deltas["resources.total"] = sum(by_platform.values())
+    return deltas
+
+
+def security_deltas(issues: Iterable[Dict[str, Any]], sign: int = 1) -> Dict[str, float]:
+    by_severity = Counter(issue["severity"] for issue in issues)
+    deltas = {f"security.by_severity.{severity}": sign * count for severity, count in by_severity.items()}
+    deltas["security.total"] = sign * sum(by_severity.values())
+    return deltas
+
+
+def cost_deltas(recommendations: Iterable[Dict[str, Any]], sign: int = 1) -> Dict[str, float]:
+    count = 0
+    savings = 0.0
+    for recommendation in recommendations:
+        count += 1
+        savings += recommendation.get("estimated_savings") or 0
+    return {"costs.recommendations": sign * count, "costs.estimated_savings": sign * savings}
+
+
+def merge_deltas(*deltas: Dict[str, float]) -> Dict[str, float]:
+    merged: Dict[str, float] = {}
+    for delta in deltas:
+        for field, value in delta.items():
+            merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+async def apply_summary_delta(
+    db,
+    user_id: str,
+    deltas: Dict[str, float],
+    latest_scan: Optional[Dict[str, Any]] = None
+) -> None:
+    """Atomically fold counter deltas (and optionally the latest scan) into a user's summary.
+
+    Every delta also bumps `revision`, which recompute_summary() uses to detect
+    deltas that land while it is aggregating.
+    """
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas and latest_scan is None:
+        return
+
+    update: Dict[str, Any] = {"$set": {"updated_at": datetime.utcnow()}}
+    if deltas:
+        update["$inc"] = dict(deltas, revision=1)
+    if latest_scan is not None:
+        update["$set"]["latest_scan"] = {k: v for k, v in latest_scan.items() if k != "_id"}
+
+    await db.dashboard_summaries.update_one({"_id": user_id}, update)
+
+
+async def recompute_summary(db, user_id: str) -> Dict[str, Any]:
+    """Rebuild a user's summary from the raw collections. Used as the repair path.
+
+    The rebuilt summary only replaces the stored one if no delta was applied
+    since the aggregation started; otherwise the rebuild is retried, and the
+    last attempt is written unconditionally.
+    """
+    for attempt in range(RECOMPUTE_ATTEMPTS):
+        current = await db.dashboard_summaries.find_one({"_id": user_id}, projection={"revision": 1})
+        revision = current.get("revision", 0) if current else 0
+        summary = await _aggregate_summary(db, user_id)
+        summary["revision"] = revision + 1
+        if attempt == RECOMPUTE_ATTEMPTS - 1:
+            await db.dashboard_summaries.replace_one({"_id": user_id}, summary, upsert=True)
+            return summary
+        if current is None:
+            try:
+                await db.dashboard_summaries.insert_one(dict(summary, _id=user_id))
+                return summary
+            except DuplicateKeyError:
+                continue
+        result = await db.dashboard_summaries.replace_one(
+            {"_id": user_id, "revision": current.get("revision")}, summary
+        )
+        if result.matched_count:
+            return summary
+    return summary
+
+
+async def _aggregate_summary(db, user_id: str) -> Dict[str, Any]:
+    resources_by_platform = {}
+    async for doc in db.resources.aggregate([
+        {"$match": {"user_id": user_id, "stale": {"$ne": True}}},
+        {"$group": {"_id": "$platform", "count": {"$sum": 1}}}
+    ]):
+        resources_by_platform[doc["_id"]] = doc["count"]
+
+    security_by_severity = {}
+    async for doc in db.security_issues.aggregate([
+        {"$match": {"user_id": user_id, "status": "open"}},
+        {"$group": {"_id": "$severity", "count": {"$sum": 1}}}
+    ]):
+        security_by_severity[doc["_id"]] = doc["count"]
+
+    total_savings = 0
+    recommendation_count = 0
+    async for doc in db.cost_recommendations.aggregate([
+        {"$match": {"user_id": user_id, "status": "open"}},
+        {"$group": {"_id": None, "total_savings": {"$sum": "$estimated_savings"}, "count": {"$sum": 1}}}
+    ]):
+        total_savings = doc["total_savings"]
+        recommendation_count = doc["count"]
+
+    latest_scan = await db.scans.find_one(
+        {"user_id": user_id},
+        sort=[("end_time", -1)],
+        projection={"_id": 0}
+    )
+
+    summary = {
+        "resources": {
+            "total": sum(resources_by_platform.values()),
+            "by_platform": resources_by_platform
+        },
+        "security": {
+            "total": sum(security_by_severity.values()),
+            "by_severity": security_by_severity
+        },
+        "costs": {
+            "estimated_savings": total_savings,
+            "recommendations": recommendation_count
+        },
+        "latest_scan": latest_scan,
+        "updated_at": datetime.utcnow()
+    }
+    return summary
+
+
+async def get_summary(db, user_id: str, read_db=None) -> Dict[str, Any]:
+    """Return the materialized summary, building it on first access.
+
+    The summary is read through `read_db` when given (e.g. secondaries), but a
+    missing one is always rebuilt from the primary so lagging data is never written back.
+    """
+    summary = await (db if read_db is None else read_db).dashboard_summaries.find_one({"_id": user_id})
+    if summary is None:
+        summary = await recompute_summary(db, user_id)
+
+    resources = summary.get("resources", {})
+    security = summary.get("security", {})
+    costs = summary.get("costs", {})
+    return {
+        "resources": {
+            "total": resources.get("total", 0),
+            "by_platform": {k: v for k, v in resources.get("by_platform", {}).items() if v}
+        },
+        "security": {
+            "total": security.get("total", 0),
+            "by_severity": {k: v for k, v in security.get("by_severity", {}).items() if v}
+        },
+        "costs": {
+            "estimated_savings": round(costs.get("estimated_savings", 0), 2),
+            "recommendations": costs.get("recommendations", 0)
+        },
+        "latest_scan": summary.get("latest_scan")
+    }
@@ -0,0 +1,188 @@
+# app/worker.py
+# Standalone scan worker: python -m app.worker [--concurrency N]
+from typing import Any, Awaitable, Callable, Dict, Set
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import time
+import uuid
+
+from prometheus_client import start_http_server
+
+from . import main as api
+from .main import scan_cloud_resources, scan_security_issues, scan_cost_optimizations, run_bulk_job
+from .indexes import ensure_indexes
+from .snapshots import snapshot_all_tenants
+from .logs import configure_logging, get_logger
+from .metrics import SCAN_JOBS, SCAN_JOB_DURATION
+from .jobs import (
+    JOB_LEASE_SECONDS, lease_job, heartbeat, complete_job, fail_job,
+    fail_abandoned_jobs, busy_tenants, claim_periodic_run,
+)
+
+SCAN_HANDLERS = {
+    "resources": scan_cloud_resources,
+    "security": scan_security_issues,
+    "costs": scan_cost_optimizations,
+    "bulk": run_bulk_job,
+}
+
+IDLE_POLL_SECONDS = float(os.getenv("WORKER_IDLE_POLL_SECONDS", "2"))
+
+# Port of the worker's Prometheus exporter; 0 disables it
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))
+
+log = get_logger("worker")
+
+# Set by main() once the worker process is running
+db = None
+
+# How often the worker refreshes today's tenant snapshots; 0 leaves it to cron (python -m app.snapshots)
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "3600"))
+
+# How often idle workers check whether a periodic task is due
+SCHEDULE_POLL_SECONDS = float(os.getenv("WORKER_SCHEDULE_POLL_SECONDS", "60"))
+
+# How often the fleet fails jobs whose final attempt lost its lease
+ABANDONED_SWEEP_SECONDS = float(os.getenv("WORKER_ABANDONED_SWEEP_SECONDS", str(JOB_LEASE_SECONDS)))
+
+
+class ScanWorker:
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.running_tenants: Set[str] = set()
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        try:
+            await ensure_indexes(db)
+        except Exception as e:
+            # Same as the API: a missing index makes queries slower, not wrong
+            log.error("Index bootstrap failed", extra={"error": str(e)})
+        log.info("Scan worker started", extra={"worker_id": self.worker_id, "concurrency": self.concurrency})
+        slots = [asyncio.create_task(self._slot()) for _ in range(self.concurrency)]
+        slots.append(asyncio.create_task(self._periodic("abandoned_jobs", ABANDONED_SWEEP_SECONDS, self._fail_abandoned)))
+        if SNAPSHOT_INTERVAL_SECONDS > 0:
+            slots.append(asyncio.create_task(self._periodic("snapshots", SNAPSHOT_INTERVAL_SECONDS, self._snapshots)))
+        await asyncio.gather(*slots)
+        log.info("Scan worker stopped", extra={"worker_id": self.worker_id})
+
+    def stop(self):
+        # Stop leasing new jobs; running scans are allowed to finish
+        self.stopping.set()
+
+    async def _slot(self):
+        while not self.stopping.is_set():
+            # One running job per tenant across all workers keeps a large tenant from starving the
+            # rest. Best effort: two workers leasing at the same moment can both start one tenant's jobs
+            exclude = set(await busy_tenants(db)) | self.running_tenants
+            job = await lease_job(db, self.worker_id, exclude_users=list(exclude))
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=IDLE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]):
+        self.running_tenants.add(job["user_id"])
+        started = time.perf_counter()
+        work = asyncio.create_task(self._run_handler(job))
+        beat = asyncio.create_task(self._heartbeat(job, work))
+        try:
+            await work
+            await complete_job(db, job, self.worker_id)
+            SCAN_JOBS.labels(job["kind"], "completed").inc()
+        except asyncio.CancelledError:
+            # The heartbeat only finishes on its own after cancelling a job whose lease was lost
+            if not beat.done() or beat.cancelled():
+                raise
+            # Whoever holds the lease now completes or fails the job
+            SCAN_JOBS.labels(job["kind"], "lost").inc()
+        except Exception as e:
+            log.error("Scan job failed", extra={
+                "scan_id": job["_id"],
+                "kind": job["kind"],
+                "attempt": job["attempts"],
+                "error": str(e)
+            })
+            await fail_job(db, job, self.worker_id, str(e))
+            SCAN_JOBS.labels(job["kind"], "failed").inc()
+        finally:
+            SCAN_JOB_DURATION.labels(job["kind"]).observe(time.perf_counter() - started)
+            beat.cancel()
+            self.running_tenants.discard(job["user_id"])
+
+    async def _run_handler(self, job: Dict[str, Any]):
+        handler = SCAN_HANDLERS[job["kind"]]
+        await handler(job["user_id"], job["_id"], **job.get("options", {}))
+
+    async def _periodic(self, name: str, interval: float, task: Callable[[], Awaitable[None]]):
+        # One worker in the fleet runs each interval of the task; the rest find the run claimed
+        while not self.stopping.is_set():
+            try:
+                if await claim_periodic_run(db, name, self.worker_id, interval):
+                    await task()
+            except Exception as e:
+                log.error("Periodic task failed", extra={"task": name, "error": str(e)})
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=min(interval, SCHEDULE_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fail_abandoned(self):
+        failed = await fail_abandoned_jobs(db)
+        if failed:
+            log.warning("Abandoned scan jobs failed", extra={"worker_id": self.worker_id, "jobs": failed})
+
+    async def _snapshots(self):
+        taken = await snapshot_all_tenants(db)
+        log.info("Tenant snapshots taken", extra={"worker_id": self.worker_id, "tenants": taken})
+
+    async def _heartbeat(self, job: Dict[str, Any], work: asyncio.Task):
+        # Beats every third of the lease, so a failed one is retried twice before the lease runs out
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                held = await heartbeat(db, job, self.worker_id)
+            except Exception as e:
+                log.warning("Scan job heartbeat failed", extra={"scan_id": job["_id"], "error": str(e)})
+                continue
+            if not held:
+                # Another worker has taken the job over; stop duplicating its writes
+                log.warning("Lost lease on scan job", extra={"scan_id": job["_id"], "worker_id": self.worker_id})
+                work.cancel()
+                return
+
+
+async def main(concurrency: int):
+    global db
+    configure_logging()
+    # The scan tasks read the API module's db, so connect through it
+    db = api.connect_database()
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+    worker = ScanWorker(concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        api.client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SpearPoint scan worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("WORKER_CONCURRENCY", "4")),
+        help="number of scans to run concurrently"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency))
@@ -0,0 +1,273 @@
+# benchmarks/load.py
+# Offline load test: python -m benchmarks.load [--tenants N] [--resources M] [--baseline FILE]
+#
+# Seeds N tenants with M synthetic resources each by running the real scan
+# tasks, then drives the API in-process through an ASGI client at each
+# concurrency level. Runs against mongomock-motor by default, or against a
+# local mongod with --mongo-url (the benchmark database is dropped first).
+# mongomock-motor evaluates queries in Python, so its absolute numbers are far
+# from production; only compare runs against a baseline from the same backend.
+# Install the extra dependencies with: pip install -r benchmarks/requirements.txt
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+# Keep per-request logging out of the measurements
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from app import collectors
+from app import main as api
+from app.indexes import ensure_indexes
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def summarize(scenario: str, concurrency: int, latencies: List[float], errors: int, wall: float, **extra) -> Dict[str, Any]:
+    latencies.sort()
+    result = {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    result.update(extra)
+    return result
+
+
+async def use_database(mongo_url: Optional[str]):
+    """Point the app at a fresh benchmark database.
+
+    Sets up the per-worker state the lifespan would create, without connecting
+    to DATABASE_URL; the ASGI transport does not run the lifespan.
+    """
+    api.init_worker_state()
+    if mongo_url:
+        import motor.motor_asyncio
+        client = motor.motor_asyncio.AsyncIOMotorClient(mongo_url)
+        await client.drop_database("spearpoint_benchmark")
+        api.db = client.spearpoint_benchmark
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        api.db = AsyncMongoMockClient().spearpoint_benchmark
+    # Standalone servers have no secondaries, so read routes hit the same database
+    api.read_db = api.db
+    await ensure_indexes(api.db)
+
+
+async def seed(tenants: int, resources: int, scan_concurrency: int) -> tuple:
+    """Create tenants and fill them through the real scan tasks, timing each task."""
+    password_hash = await api.get_password_hash(PASSWORD)
+    users = []
+    for i in range(tenants):
+        email = f"tenant{i}@benchmark.example.com"
+        result = await api.db.users.insert_one({
+            "name": f"Tenant {i}",
+            "email": email,
+            "password": password_hash,
+            "role": "user",
+            "created_at": datetime.utcnow()
+        })
+        user_id = str(result.inserted_id)
+        await api.db.cloud_credentials.insert_one({
+            "user_id": user_id,
+            "aws": {"access_key": "benchmark"},
+            "azure": {"tenant_id": "benchmark"},
+            "gcp": {"project_id": "benchmark"}
+        })
+        users.append({"id": user_id, "email": email, "token": api.create_user_token(user_id, "user", None)})
+
+    # FakeCollector emits this many resources per connected platform
+    collectors.SCAN_FAKE_RESOURCES = max(1, resources // 3)
+
+    results = []
+    semaphore = asyncio.Semaphore(scan_concurrency)
+    scans = [
+        ("scan_resources", api.scan_cloud_resources, {}),
+        ("scan_security", api.scan_security_issues, {"full": True}),
+        ("scan_costs", api.scan_cost_optimizations, {"full": True}),
+    ]
+    for name, task, options in scans:
+        latencies: List[float] = []
+        errors = 0
+
+        async def run(user):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await task(user["id"], f"benchmark-{name}-{user['id']}", **options)
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run(user) for user in users))
+        wall = time.perf_counter() - start
+        results.append(summarize(
+            name, scan_concurrency, latencies, errors, wall,
+            items_per_sec=round(len(latencies) * collectors.SCAN_FAKE_RESOURCES * 3 / wall, 1) if wall else 0.0
+        ))
+    return users, results
+
+
+def scenarios(users: List[Dict[str, Any]]) -> Dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    def auth(i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {users[i % len(users)]['token']}"}
+
+    return {
+        "login": lambda client, i: client.post(
+            "/api/auth/login", json={"email": users[i % len(users)]["email"], "password": PASSWORD}
+        ),
+        "get_resources": lambda client, i: client.get("/api/resources?limit=100", headers=auth(i)),
+        "get_security_issues": lambda client, i: client.get("/api/security/issues", headers=auth(i)),
+        "get_dashboard_summary": lambda client, i: client.get("/api/dashboard/summary", headers=auth(i)),
+    }
+
+
+async def drive(client: httpx.AsyncClient, call, requests: int, concurrency: int):
+    """Issue `requests` calls from `concurrency` concurrent clients; return latencies, errors and wall time."""
+    latencies: List[float] = []
+    errors = 0
+    issued = 0
+
+    async def client_loop():
+        nonlocal errors, issued
+        while issued < requests:
+            i = issued
+            issued += 1
+            start = time.perf_counter()
+            try:
+                response = await call(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions against a previous run: p95 latency up or throughput down by more than `tolerance`."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["concurrency"]))
+        if before is None:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{result['scenario']}@{result['concurrency']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms"
+            )
+        if before["rps"] and result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{result['scenario']}@{result['concurrency']}: rps {before['rps']} -> {result['rps']}"
+            )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<24}{'conc':>6}{'reqs':>8}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}{'rss MB':>9}")
+    for r in results:
+        print(
+            f"{r['scenario']:<24}{r['concurrency']:>6}{r['requests']:>8}{r['errors']:>6}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>10}{r['peak_rss_mb']:>9}"
+        )
+
+
+async def run(args) -> int:
+    await use_database(args.mongo_url)
+    users, results = await seed(args.tenants, args.resources, args.scan_concurrency)
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, call in scenarios(users).items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            # bcrypt makes logins orders of magnitude slower than reads
+            requests = args.login_requests if name == "login" else args.requests
+            for concurrency in args.concurrency:
+                latencies, errors, wall = await drive(client, call, requests, concurrency)
+                results.append(summarize(name, concurrency, latencies, errors, wall))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": "mongod" if args.mongo_url else "mongomock",
+            "tenants": args.tenants,
+            "resources_per_tenant": collectors.SCAN_FAKE_RESOURCES * 3,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SpearPoint backend load test")
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--resources", type=int, default=300, help="resources per tenant")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32],
+                        help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario and level")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--scan-concurrency", type=int, default=4)
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=None,
+                        help="comma separated subset of login,get_resources,get_security_issues,get_dashboard_summary")
+    parser.add_argument("--mongo-url", default=None, help="use a real mongod instead of mongomock-motor")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,77 @@
+# gunicorn.conf.py
+# Production entry point: gunicorn app.main:app -c gunicorn.conf.py
+#
+# Runs WEB_CONCURRENCY uvicorn workers behind one gunicorn master. The app is
+# not preloaded: each worker imports it and opens its own Mongo client, caches
+# and hashing pool in the lifespan, after fork. On SIGTERM the master stops
+# accepting connections and gives workers GRACEFUL_TIMEOUT seconds to finish
+# in-flight requests; keep that below the ECS task's stopTimeout.
+import os
+import shutil
+
+# Shared metric files for the workers (see app/metrics.py). Set here rather than in
+# the image so processes not started by gunicorn, like the scan worker, keep
+# ordinary in-process metrics.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+
+def cpu_count() -> int:
+    """CPUs this container may use: the cgroup quota when one is set, else the affinity mask."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '3001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+
+# Seconds a worker gets to drain in-flight requests after SIGTERM
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "25"))
+# Workers silent for this long are killed and replaced
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+# Longer than the load balancer's idle timeout so it never reuses a closed connection
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "65"))
+
+# Recycle workers after this many requests (0 never does); jitter keeps them from restarting together
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+# The app writes its own structured access log (see ACCESS_LOG_SAMPLE_RATE in app/logs.py)
+accesslog = None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "INFO").lower()
+
+
+def on_starting(server):
+    # Clear metric files left by a previous master so counters start from zero
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (requests in flight) from /metrics
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient().spearpoint
+
+
+@pytest.fixture
+def api(db, monkeypatch):
+    """The API module with its per-process state set up against the `db` fixture."""
+    from app import main
+
+    main.init_worker_state()
+    monkeypatch.setattr(main, "db", db)
+    monkeypatch.setattr(main, "read_db", db)
+    yield main
+    main.password_hasher.shutdown()
+
+
+@pytest.fixture
+def client(api):
+    # Not used as a context manager, so the lifespan never connects to a real MongoDB
+    return TestClient(api.app)
+
+
+@pytest.fixture
+def registration(client):
+    return client.post(
+        "/api/auth/register", json={"name": "Test", "email": "test@example.com", "password": "password123"}
+    ).json()
+
+
+@pytest.fixture
+def user_id(registration):
+    return registration["user"]["id"]
+
+
+@pytest.fixture
+def auth_headers(registration):
+    return {"Authorization": f"Bearer {registration['token']}"}
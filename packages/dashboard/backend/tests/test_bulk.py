@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.bulk import apply_bulk_action, bulk_query
+from app.summary import get_summary
+
+USER = "user-1"
+
+
+async def add_issues(db, *findings):
+    result = await db.security_issues.insert_many([
+        {"user_id": USER, "resource_id": f"r{i}", "severity": severity, "status": status}
+        for i, (severity, status) in enumerate(findings)
+    ])
+    return [str(i) for i in result.inserted_ids]
+
+
+@pytest.mark.anyio
+async def test_comma_separated_filters_select_every_listed_value(db):
+    await add_issues(db, ("high", "open"), ("critical", "open"), ("low", "open"))
+
+    updated = await apply_bulk_action(db, "remediate", USER, bulk_query("remediate", USER, filters={"severity": "high,critical"}))
+
+    assert len(updated) == 2
+    assert await db.security_issues.distinct("severity", {"status": "open"}) == ["low"]
+
+
+@pytest.mark.anyio
+async def test_only_findings_this_call_changed_are_reported(db):
+    ids = await add_issues(db, ("high", "open"), ("low", "remediated"))
+    await get_summary(db, USER)
+
+    # Selected without the status guard, as if the second finding was remediated
+    # by another request between the read and the write
+    updated = await apply_bulk_action(db, "remediate", USER, {"user_id": USER})
+
+    assert updated == [ids[0]]
+    assert (await get_summary(db, USER))["security"] == {"total": 0, "by_severity": {}}
+
+
+def test_per_id_results(client, db, auth_headers, user_id):
+    result = asyncio.run(db.security_issues.insert_many([
+        {"user_id": user_id, "resource_id": "r1", "severity": "high", "status": "open"},
+        {"user_id": user_id, "resource_id": "r2", "severity": "low", "status": "remediated"},
+    ]))
+    open_id, remediated_id = (str(i) for i in result.inserted_ids)
+    missing_id = str(ObjectId())
+
+    response = client.post(
+        "/api/security/issues/remediate",
+        json={"ids": [open_id, remediated_id, missing_id]},
+        headers=auth_headers
+    ).json()
+
+    assert response["updated"] == 1
+    assert response["results"] == [
+        {"id": open_id, "result": "updated"},
+        {"id": remediated_id, "result": "unchanged"},
+        {"id": missing_id, "result": "not_found"},
+    ]
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from app.caching import MemoryResponseCache, bump_data_version, is_cacheable
+from app.lru import LRUCache
+
+
+@pytest.fixture
+def response_cache(api, monkeypatch):
+    cache = MemoryResponseCache()
+    monkeypatch.setattr(api, "response_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def resource(db, user_id):
+    document = {"id": "i-1", "type": "t3.micro", "platform": "aws", "user_id": user_id}
+    asyncio.run(db.resources.insert_one(document))
+    return document
+
+
+def test_unchanged_data_is_answered_with_304(client, auth_headers, resource):
+    first = client.get("/api/resources", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert first.headers["content-type"] == "application/json"
+
+    again = client.get("/api/resources", headers={**auth_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_a_data_version_bump_changes_the_etag(client, db, auth_headers, user_id, resource):
+    etag = client.get("/api/resources", headers=auth_headers).headers["etag"]
+
+    asyncio.run(bump_data_version(db, user_id))
+    response = client.get("/api/resources", headers={**auth_headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_etags_differ_per_url(client, auth_headers, resource):
+    assert client.get("/api/resources", headers=auth_headers).headers["etag"] != \
+        client.get("/api/resources?platform=aws", headers=auth_headers).headers["etag"]
+
+
+def test_cached_body_is_served_until_the_version_changes(client, db, auth_headers, user_id, resource, response_cache):
+    body = client.get("/api/resources", headers=auth_headers).json()
+    asyncio.run(db.resources.delete_many({}))
+
+    assert client.get("/api/resources", headers=auth_headers).json() == body
+    assert response_cache.stats()["hits"] == 1
+
+    asyncio.run(bump_data_version(db, user_id))
+    assert client.get("/api/resources", headers=auth_headers).json()["results"] == 0
+
+
+def test_lists_with_ttl_managed_data_bypass_the_cache(client, auth_headers, resource, response_cache):
+    response = client.get("/api/resources?include_stale=true", headers=auth_headers)
+
+    assert "etag" not in response.headers
+    assert response_cache.stats()["size"] == 0
+    assert is_cacheable("/api/resources", {"include_stale": "false"})
+    assert not is_cacheable("/api/resources", {"include_stale": "1"})
+    assert not is_cacheable("/api/scans/abc")
+
+
+def test_lru_cache_evicts_and_expires():
+    cache = LRUCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
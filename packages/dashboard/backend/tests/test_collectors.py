@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from app import collectors
+from app.collectors import (
+    Collector, CollectorScheduler, TokenBucket, build_collection_tasks, parse_rate_limits, rate_limiter,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_buckets(monkeypatch):
+    # Buckets hold an asyncio.Lock, which must not outlive the test's event loop
+    monkeypatch.setattr(collectors, "_buckets", {})
+
+
+class PagedCollector(Collector):
+    platform = "aws"
+    service = "test"
+    default_regions = ["us-east-1"]
+
+    def __init__(self, pages=2, fail_in=None):
+        super().__init__("u", {})
+        self.count = pages
+        self.fail_in = fail_in
+
+    async def pages(self, region, account):
+        if region == self.fail_in:
+            raise RuntimeError("throttled")
+        for i in range(self.count):
+            yield [{"id": f"{region}-{account}-{i}", "platform": self.platform, "region": region}]
+
+
+def test_collectors_must_implement_pages():
+    class Incomplete(Collector):
+        platform = "aws"
+
+    with pytest.raises(TypeError):
+        Incomplete("u", {})
+
+
+def test_tasks_fan_out_over_regions_and_accounts():
+    credentials = {"aws": {"regions": "us-east-1, eu-west-1", "accounts": "111,222"}, "gcp": {}}
+
+    tasks = build_collection_tasks("u", credentials)
+
+    assert [(c.platform, region, account) for c, region, account in tasks] == [
+        ("aws", "us-east-1", "111"), ("aws", "us-east-1", "222"),
+        ("aws", "eu-west-1", "111"), ("aws", "eu-west-1", "222"),
+    ]
+
+
+def test_rate_limits_parse():
+    assert parse_rate_limits("aws=20, azure=2.5,,") == {"aws": 20.0, "azure": 2.5}
+
+
+@pytest.mark.anyio
+async def test_scheduler_merges_pages_and_records_failures():
+    collector = PagedCollector(pages=3, fail_in="eu-west-1")
+    scheduler = CollectorScheduler(concurrency=2, rate_limits={})
+
+    pages = [page async for page in scheduler.run([
+        (collector, "us-east-1", None), (collector, "us-west-2", None), (collector, "eu-west-1", None),
+    ])]
+
+    assert sorted(page[0]["id"] for page in pages) == sorted(
+        f"{region}-None-{i}" for region in ("us-east-1", "us-west-2") for i in range(3)
+    )
+    assert scheduler.failures == [
+        {"platform": "aws", "service": "test", "region": "eu-west-1", "account": None, "error": "throttled"}
+    ]
+    assert scheduler.failed_platforms() == ["aws"]
+
+
+@pytest.mark.anyio
+async def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+
+    await asyncio.gather(*(bucket.acquire() for _ in range(15)))
+
+    # 5 from the initial burst, then 10 more at 50/s
+    assert time.monotonic() - started >= 0.18
+
+
+@pytest.mark.anyio
+async def test_schedulers_share_one_bucket_per_provider_account():
+    first = CollectorScheduler(rate_limits={"aws": 5})
+    second = CollectorScheduler(rate_limits={"aws": 5})
+    collector = PagedCollector(pages=5)
+    started = time.monotonic()
+
+    # Two scans of the same account: 10 pages against one budget of 5 per second
+    await asyncio.gather(*(
+        asyncio.create_task(_drain(scheduler.run([(collector, "us-east-1", "111")])))
+        for scheduler in (first, second)
+    ))
+
+    assert time.monotonic() - started >= 0.9
+    assert rate_limiter("aws", "111", 5) is rate_limiter("aws", "111", 5)
+    assert rate_limiter("aws", "222", 5) is not rate_limiter("aws", "111", 5)
+
+
+async def _drain(pages):
+    return [page async for page in pages]
+
+
+@pytest.mark.anyio
+async def test_resource_scan_keeps_one_document_per_region(api, db, monkeypatch):
+    monkeypatch.setattr(collectors, "SCAN_FAKE_RESOURCES", 0)
+    await db.cloud_credentials.insert_one({"user_id": "u", "aws": {"regions": "us-east-1,eu-west-1"}})
+    await db.scan_jobs.insert_one({"_id": "scan-1", "user_id": "u"})
+
+    await api.scan_cloud_resources("u", "scan-1")
+    await api.scan_cloud_resources("u", "scan-1")
+
+    regions = sorted([doc["region"] async for doc in db.resources.find({"user_id": "u"})])
+    assert regions == ["eu-west-1", "us-east-1"]
@@ -0,0 +1,62 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import export
+
+
+@pytest.fixture
+def resources(db, user_id):
+    documents = [
+        {
+            "id": f"i-{i}", "name": f"vm-{i}", "type": "t3.micro", "platform": "aws", "region": "us-east-1",
+            "user_id": user_id, "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+        }
+        for i in range(5)
+    ]
+    documents.append(dict(documents[0], id="i-stale", stale=True))
+    asyncio.run(db.resources.insert_many(documents))
+    return documents
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # Several batches per export, so the streamed chunks are exercised
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+
+
+def test_csv_export_streams_every_row(client, auth_headers, resources):
+    response = client.get("/api/export/resources?format=csv&fields=name,region", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"].startswith('attachment; filename="resources-')
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "name", "region"]
+    assert sorted(row[1] for row in rows[1:]) == [f"vm-{i}" for i in range(5)]
+
+
+def test_csv_export_applies_list_filters(client, auth_headers, resources):
+    response = client.get("/api/export/resources?include_stale=true&platform=aws,gcp", headers=auth_headers)
+
+    assert len(list(csv.reader(io.StringIO(response.text)))) == 1 + 6
+
+
+def test_parquet_export(client, auth_headers, resources):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = client.get("/api/export/resources?format=parquet", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.schema_arrow.names[:4] == ["id", "name", "type", "platform"]
+    assert parquet.metadata.num_rows == 5
+    assert parquet.metadata.num_row_groups == 3
+
+
+def test_unknown_export_is_404(client, auth_headers):
+    assert client.get("/api/export/users", headers=auth_headers).status_code == 404
@@ -0,0 +1,131 @@
+from datetime import datetime
+
+import pytest
+
+from app.caching import get_data_version
+from app.findings import prepare_findings_key, sync_findings
+from app.summary import security_deltas
+
+USER = "user-1"
+
+
+def issue(resource_id, rule_id="open-port", severity="high"):
+    return {"user_id": USER, "resource_id": resource_id, "rule_id": rule_id, "severity": severity, "status": "open"}
+
+
+async def scan(collection, resource_ids, findings, scan_id="scan"):
+    return await sync_findings(
+        collection, USER, scan_id, resource_ids, findings, security_deltas, {"severity": 1}
+    )
+
+
+async def statuses(collection):
+    return {
+        (doc["resource_id"], doc["rule_id"]): doc["status"]
+        async for doc in collection.find({"user_id": USER})
+    }
+
+
+@pytest.mark.anyio
+async def test_new_findings_are_opened(db):
+    deltas = await scan(db.security_issues, ["r1", "r2"], [issue("r1"), issue("r2", severity="low")])
+
+    assert await statuses(db.security_issues) == {("r1", "open-port"): "open", ("r2", "open-port"): "open"}
+    assert deltas == {"security.by_severity.high": 1, "security.by_severity.low": 1, "security.total": 2}
+    doc = await db.security_issues.find_one({"resource_id": "r1"})
+    assert doc["first_seen"] == doc["created_at"] == doc["last_seen"]
+    assert doc["last_seen_scan"] == "scan"
+
+
+@pytest.mark.anyio
+async def test_rescan_keeps_one_document_and_bumps_last_seen(db):
+    await scan(db.security_issues, ["r1"], [issue("r1")], scan_id="first")
+    first = await db.security_issues.find_one({"resource_id": "r1"})
+
+    deltas = await scan(db.security_issues, ["r1"], [issue("r1")], scan_id="second")
+
+    docs = await db.security_issues.find({"resource_id": "r1"}).to_list(None)
+    assert len(docs) == 1
+    assert docs[0]["_id"] == first["_id"]
+    assert docs[0]["created_at"] == first["created_at"]
+    assert docs[0]["last_seen_scan"] == "second"
+    assert not any(deltas.values())
+
+
+@pytest.mark.anyio
+async def test_unreported_findings_of_evaluated_resources_are_resolved(db):
+    await scan(db.security_issues, ["r1", "r2"], [issue("r1"), issue("r2")])
+
+    deltas = await scan(db.security_issues, ["r1"], [])
+
+    assert await statuses(db.security_issues) == {("r1", "open-port"): "resolved", ("r2", "open-port"): "open"}
+    assert deltas == {"security.by_severity.high": -1, "security.total": -1}
+    assert (await db.security_issues.find_one({"resource_id": "r1"}))["resolved_at"] is not None
+
+
+@pytest.mark.anyio
+async def test_resolved_finding_is_reopened_when_reported_again(db):
+    await scan(db.security_issues, ["r1"], [issue("r1")])
+    await scan(db.security_issues, ["r1"], [])
+
+    deltas = await scan(db.security_issues, ["r1"], [issue("r1")])
+
+    doc = await db.security_issues.find_one({"resource_id": "r1"})
+    assert doc["status"] == "open"
+    assert "resolved_at" not in doc
+    assert deltas == {"security.by_severity.high": 1, "security.total": 1}
+
+
+@pytest.mark.anyio
+async def test_user_states_are_left_alone(db):
+    await scan(db.security_issues, ["r1", "r2"], [issue("r1"), issue("r2")])
+    await db.security_issues.update_one({"resource_id": "r1"}, {"$set": {"status": "remediated"}})
+
+    # Reported again: stays remediated and does not count as open
+    deltas = await scan(db.security_issues, ["r1"], [issue("r1")])
+    assert await statuses(db.security_issues) == {("r1", "open-port"): "remediated", ("r2", "open-port"): "open"}
+    assert not any(deltas.values())
+
+    # No longer reported: not resolved over the user's state either
+    await scan(db.security_issues, ["r1"], [])
+    assert (await statuses(db.security_issues))[("r1", "open-port")] == "remediated"
+
+
+@pytest.mark.anyio
+async def test_severity_change_moves_the_open_count(db):
+    await scan(db.security_issues, ["r1"], [issue("r1", severity="high")])
+
+    deltas = await scan(db.security_issues, ["r1"], [issue("r1", severity="critical")])
+
+    assert {field: value for field, value in deltas.items() if value} == {
+        "security.by_severity.critical": 1, "security.by_severity.high": -1
+    }
+
+
+@pytest.mark.anyio
+async def test_nothing_evaluated_is_a_no_op(db):
+    assert await scan(db.security_issues, [], [issue("r1")]) == {}
+    assert await db.security_issues.count_documents({}) == 0
+
+
+@pytest.mark.anyio
+async def test_legacy_findings_get_rule_ids_and_are_deduplicated(db):
+    old, new = datetime(2024, 1, 1), datetime(2024, 1, 2)
+    legacy = {"user_id": USER, "resource_id": "r1", "platform": "aws", "issue": "Security group allows SSH from any IP"}
+    await db.security_issues.insert_many([
+        dict(legacy, last_seen=old, severity="low"),
+        dict(legacy, last_seen=new, severity="high"),
+        {"user_id": USER, "resource_id": "r2", "platform": "aws", "issue": "Retired check"},
+    ])
+    await db.dashboard_summaries.insert_one({"_id": USER})
+
+    result = await prepare_findings_key(db, db.security_issues)
+
+    assert result == {"rule_ids_backfilled": 3, "duplicates_removed": 1}
+    docs = {doc["resource_id"]: doc async for doc in db.security_issues.find()}
+    assert docs["r1"]["rule_id"] == "aws-ec2-open-ssh"
+    assert docs["r1"]["severity"] == "high"
+    assert docs["r2"]["rule_id"].startswith("legacy-")
+    # The tenant's summary is rebuilt from what is left
+    assert await db.dashboard_summaries.count_documents({}) == 0
+    assert await get_data_version(db, USER) == 1
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.hashing import HasherBusy, PasswordHasher
+
+
+class BlockingContext:
+    """passlib stand-in whose hash() blocks until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(5)
+        return f"hashed:{password}"
+
+
+@pytest.mark.anyio
+async def test_cancelled_queued_job_frees_its_slot():
+    context = BlockingContext()
+    hasher = PasswordHasher(context, max_workers=1, max_queue=2)
+    try:
+        running = asyncio.create_task(hasher.hash("a"))
+        waiting = asyncio.create_task(hasher.hash("b"))
+        await asyncio.sleep(0.05)
+        assert hasher.stats()["queued"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        context.release.set()
+        assert await running == "hashed:a"
+
+        stats = hasher.stats()
+        assert (stats["queued"], stats["in_flight"], stats["completed"]) == (0, 0, 1)
+    finally:
+        context.release.set()
+        hasher.shutdown()
+
+
+@pytest.mark.anyio
+async def test_full_queue_rejects():
+    context = BlockingContext()
+    hasher = PasswordHasher(context, max_workers=1, max_queue=1)
+    try:
+        running = asyncio.create_task(hasher.hash("a"))
+        waiting = asyncio.create_task(hasher.hash("b"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HasherBusy):
+            await hasher.hash("c")
+        context.release.set()
+        await asyncio.gather(running, waiting)
+        assert hasher.stats()["rejected"] == 1
+    finally:
+        context.release.set()
+        hasher.shutdown()
@@ -0,0 +1,54 @@
+import pytest
+
+from app.ingest import mark_stale_resources, upsert_resources
+
+USER = "user-1"
+
+
+def vm(i, **fields):
+    return {"id": f"i-{i}", "platform": "aws", "type": "t3.micro", "tags": {"env": "dev"}, **fields}
+
+
+async def scan(db, scan_id, resources):
+    counts = await upsert_resources(db, USER, scan_id, resources, batch_size=2)
+    stale = await mark_stale_resources(db, USER, scan_id, ["aws"])
+    return {name: counter["aws"] for name, counter in counts.items()}, stale["aws"]
+
+
+@pytest.mark.anyio
+async def test_first_scan_inserts_every_resource(db):
+    counts, stale = await scan(db, "s1", [vm(i) for i in range(3)])
+
+    assert counts == {"inserted": 3, "revived": 0, "changed": 3, "seen": 3}
+    assert stale == 0
+    assert await db.resources.count_documents({"user_id": USER}) == 3
+
+
+@pytest.mark.anyio
+async def test_rescan_updates_in_place_and_only_flags_real_changes(db):
+    await scan(db, "s1", [vm(i) for i in range(3)])
+    first = await db.resources.find_one({"id": "i-0"})
+
+    counts, _ = await scan(db, "s2", [vm(0), vm(1), vm(2, tags={"env": "prod"})])
+
+    assert counts == {"inserted": 0, "revived": 0, "changed": 1, "seen": 3}
+    assert await db.resources.count_documents({"user_id": USER}) == 3
+    again = await db.resources.find_one({"id": "i-0"})
+    assert again["_id"] == first["_id"]
+    assert again["changed_at"] == first["changed_at"]
+    assert again["last_seen_scan"] == "s2"
+
+
+@pytest.mark.anyio
+async def test_unseen_resources_go_stale_and_come_back(db):
+    await scan(db, "s1", [vm(0), vm(1)])
+
+    _, stale = await scan(db, "s2", [vm(0)])
+    assert stale == 1
+    assert (await db.resources.find_one({"id": "i-1"}))["stale"] is True
+
+    counts, stale = await scan(db, "s3", [vm(0), vm(1)])
+    assert (counts["revived"], counts["changed"], stale) == (1, 1, 0)
+    revived = await db.resources.find_one({"id": "i-1"})
+    assert revived["stale"] is False
+    assert "stale_since" not in revived
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.jobs import (
+    JOB_MAX_ATTEMPTS, busy_tenants, complete_job, enqueue_scan, fail_abandoned_jobs, fail_job, heartbeat, lease_job,
+)
+
+
+async def expire_lease(db, job_id):
+    await db.scan_jobs.update_one({"_id": job_id}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+
+
+@pytest.mark.anyio
+async def test_jobs_are_leased_oldest_first_and_once(db):
+    first = await enqueue_scan(db, "user-1", "resources")
+    await enqueue_scan(db, "user-2", "security")
+
+    job = await lease_job(db, "worker-a")
+
+    assert (job["_id"], job["status"], job["lease_owner"], job["attempts"]) == (first, "running", "worker-a", 1)
+    assert (await lease_job(db, "worker-b"))["user_id"] == "user-2"
+    assert await lease_job(db, "worker-c") is None
+    assert sorted(await busy_tenants(db)) == ["user-1", "user-2"]
+
+
+@pytest.mark.anyio
+async def test_busy_tenants_are_skipped(db):
+    await enqueue_scan(db, "user-1", "resources")
+    later = await enqueue_scan(db, "user-2", "resources")
+
+    assert (await lease_job(db, "worker-a", exclude_users=["user-1"]))["_id"] == later
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_taken_over(db):
+    scan_id = await enqueue_scan(db, "user-1", "resources")
+    job = await lease_job(db, "worker-a")
+    assert await heartbeat(db, job, "worker-a")
+
+    await expire_lease(db, scan_id)
+    taken = await lease_job(db, "worker-b")
+
+    assert (taken["lease_owner"], taken["attempts"]) == ("worker-b", 2)
+    assert not await heartbeat(db, job, "worker-a")
+    await complete_job(db, taken, "worker-b")
+    assert (await db.scan_jobs.find_one({"_id": scan_id}))["status"] == "completed"
+
+
+@pytest.mark.anyio
+async def test_failed_job_is_retried_later(db):
+    scan_id = await enqueue_scan(db, "user-1", "resources")
+    job = await lease_job(db, "worker-a")
+
+    await fail_job(db, job, "worker-a", "boom")
+
+    stored = await db.scan_jobs.find_one({"_id": scan_id})
+    assert (stored["status"], stored["error"]) == ("queued", "boom")
+    assert stored["available_at"] > datetime.utcnow()
+    assert await lease_job(db, "worker-a") is None
+
+
+@pytest.mark.anyio
+async def test_lost_final_attempt_is_failed(db):
+    scan_id = await enqueue_scan(db, "user-1", "resources")
+    await db.scan_jobs.update_one({"_id": scan_id}, {"$set": {"attempts": JOB_MAX_ATTEMPTS - 1}})
+    await lease_job(db, "worker-a")
+    assert await fail_abandoned_jobs(db) == 0
+
+    await expire_lease(db, scan_id)
+
+    assert await lease_job(db, "worker-b") is None
+    assert await fail_abandoned_jobs(db) == 1
+    assert (await db.scan_jobs.find_one({"_id": scan_id}))["status"] == "failed"
+
+
+def test_retried_resource_scan_keeps_one_scan_record(api, db, user_id):
+    asyncio.run(db.cloud_credentials.insert_one({"user_id": user_id}))
+
+    async def run_twice():
+        scan_id = await enqueue_scan(db, user_id, "resources")
+        await api.scan_cloud_resources(user_id, scan_id)
+        await api.scan_cloud_resources(user_id, scan_id)
+        return scan_id
+
+    scan_id = asyncio.run(run_twice())
+
+    records = asyncio.run(db.scans.find({"user_id": user_id}).to_list(None))
+    assert [(r["_id"], r["scan_id"], r["status"]) for r in records] == [(scan_id, scan_id, "completed")]
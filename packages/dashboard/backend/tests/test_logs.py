@@ -0,0 +1,34 @@
+import logging
+
+import pytest
+
+from app import logs
+
+
+@pytest.fixture
+def records():
+    captured = []
+    handler = logging.Handler()
+    handler.emit = captured.append
+    logger = logging.getLogger("spearpoint.api")
+    logger.addHandler(handler)
+    yield captured
+    logger.removeHandler(handler)
+
+
+def test_requests_are_logged_at_info(client, auth_headers, records):
+    client.get("/api/resources?limit=1", headers=auth_headers)
+
+    (record,) = [r for r in records if r.getMessage() == "Request completed" and r.path == "/api/resources"]
+    assert record.levelno == logging.INFO
+    assert (record.method, record.route, record.status) == ("GET", "/api/resources", 200)
+
+
+def test_sampling_keeps_server_errors(monkeypatch):
+    monkeypatch.setattr(logs, "ACCESS_LOG_SAMPLE_RATE", 0)
+
+    assert not logs.sample_access_log(200)
+    assert logs.sample_access_log(503)
+
+    monkeypatch.setattr(logs, "ACCESS_LOG_SAMPLE_RATE", 1)
+    assert logs.sample_access_log(200)
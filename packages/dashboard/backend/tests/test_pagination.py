@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.findings import SECURITY_ISSUE_SORTS
+from app.pagination import apply_cursor, decode_cursor, encode_cursor, keyset_sort, parse_sort
+
+BASE = datetime(2024, 1, 1)
+
+
+def test_parse_sort_defaults_to_created_at_ascending():
+    assert parse_sort(None, SECURITY_ISSUE_SORTS) == ("created_at", False)
+
+
+def test_parse_sort_maps_public_names_and_direction():
+    assert parse_sort("severity", SECURITY_ISSUE_SORTS) == ("severity_rank", False)
+    assert parse_sort("-severity", SECURITY_ISSUE_SORTS) == ("severity_rank", True)
+
+
+@pytest.mark.parametrize("sort", ["estimated_savings", "-status", "-"])
+def test_parse_sort_rejects_unknown_fields(sort):
+    with pytest.raises(ValueError, match="Cannot sort by"):
+        parse_sort(sort, SECURITY_ISSUE_SORTS)
+
+
+def test_cursor_round_trips_ids_and_dates():
+    doc_id = ObjectId()
+    fragment = decode_cursor(encode_cursor({"_id": doc_id, "created_at": BASE}))
+    assert fragment == {"$or": [
+        {"created_at": {"$gt": BASE}},
+        {"created_at": BASE, "_id": {"$gt": doc_id}},
+    ]}
+
+
+def test_cursor_keeps_string_ids():
+    fragment = decode_cursor(encode_cursor({"_id": "r-1", "created_at": BASE}))
+    assert fragment["$or"][1]["_id"] == {"$gt": "r-1"}
+
+
+@pytest.mark.parametrize("field, descending", [
+    ("created_at", True),
+    ("severity_rank", False),
+    ("severity_rank", True),
+])
+def test_cursor_from_default_sort_is_rejected_for_another_sort(field, descending):
+    cursor = encode_cursor({"_id": ObjectId(), "created_at": BASE})
+    with pytest.raises(ValueError, match="does not match the requested sort"):
+        decode_cursor(cursor, field, descending)
+
+
+def test_cursor_for_another_direction_is_rejected():
+    cursor = encode_cursor({"_id": ObjectId(), "severity_rank": 3}, "severity_rank", descending=True)
+    with pytest.raises(ValueError, match="does not match the requested sort"):
+        decode_cursor(cursor, "severity_rank", descending=False)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid pagination cursor"):
+        decode_cursor(cursor)
+
+
+def test_null_cursor_ascending_continues_with_nulls_then_values():
+    doc_id = ObjectId()
+    fragment = decode_cursor(encode_cursor({"_id": doc_id, "severity_rank": None}, "severity_rank"), "severity_rank")
+    assert fragment == {"$or": [
+        {"severity_rank": {"$ne": None}},
+        {"severity_rank": None, "_id": {"$gt": doc_id}},
+    ]}
+
+
+def test_null_cursor_descending_only_has_nulls_left():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id, "severity_rank": None}, "severity_rank", descending=True)
+    assert decode_cursor(cursor, "severity_rank", descending=True) == {"severity_rank": None, "_id": {"$lt": doc_id}}
+
+
+def test_value_cursor_descending_includes_nulls():
+    doc_id = ObjectId()
+    cursor = encode_cursor({"_id": doc_id, "severity_rank": 2}, "severity_rank", descending=True)
+    assert decode_cursor(cursor, "severity_rank", descending=True) == {"$or": [
+        {"severity_rank": {"$lt": 2}},
+        {"severity_rank": 2, "_id": {"$lt": doc_id}},
+        {"severity_rank": None},
+    ]}
+
+
+async def _walk(collection, field, descending, page_size):
+    """Page through `collection` with keyset cursors; returns the _ids in visiting order."""
+    seen, after = [], None
+    while True:
+        query = apply_cursor({}, after, field, descending)
+        page = await collection.find(query).sort(keyset_sort(field, descending)).to_list(page_size)
+        seen.extend(doc["_id"] for doc in page)
+        if len(page) < page_size:
+            return seen
+        after = encode_cursor(page[-1], field, descending)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3])
+async def test_paging_visits_every_document_once_in_sort_order(db, descending, page_size):
+    ranks = [None, 1, None, 3, 2, 2, None, 4]
+    await db.security_issues.insert_many([
+        {"severity_rank": rank, "created_at": BASE + timedelta(minutes=i)} for i, rank in enumerate(ranks)
+    ])
+    expected = [
+        doc["_id"] async for doc in db.security_issues.find().sort(keyset_sort("severity_rank", descending))
+    ]
+
+    assert await _walk(db.security_issues, "severity_rank", descending, page_size) == expected
@@ -0,0 +1,88 @@
+import pytest
+
+from app.pricing import PricingCatalog, get_pricing_catalog
+
+CATALOG = {
+    "currency": "USD",
+    "hours_per_month": 100,
+    "default_regions": {"aws": "us-east-1"},
+    "skus": [
+        {"platform": "aws", "region": "us-east-1", "sku": "m5.large", "hourly": 0.10},
+        {"platform": "aws", "region": "us-east-1", "sku": "m5.medium", "hourly": 0.05},
+        {"platform": "aws", "region": "eu-west-1", "sku": "m5.large", "hourly": 0.20},
+        {"platform": "aws", "region": "eu-west-1", "sku": "m5.medium", "hourly": 0.08},
+        {"platform": "gcp", "region": "us-central1", "sku": "e2-medium", "hourly": 0.04},
+        {"platform": "gcp", "region": "us-central1", "sku": "e2-small", "hourly": 0.05},
+    ],
+    "rightsizing": [
+        {
+            "id": "aws-downsize", "platform": "aws", "sku": "m5.large", "recommended_sku": "m5.medium",
+            "discount": 0.5, "resource_label": "EC2 Instance", "impact": "medium", "justification": "Idle",
+            "current_configuration": "m5.large", "recommended_configuration": "m5.medium reserved",
+        },
+        {
+            "id": "gcp-upsize", "platform": "gcp", "sku": "e2-medium", "recommended_sku": "e2-small",
+            "resource_label": "Instance", "impact": "low", "justification": "Costs more",
+            "current_configuration": "e2-medium", "recommended_configuration": "e2-small",
+        },
+    ],
+}
+
+
+@pytest.fixture
+def catalog():
+    return PricingCatalog(CATALOG)
+
+
+def test_savings_are_priced_per_region_with_discount(catalog):
+    resources = [
+        {"id": "a", "platform": "aws", "type": "m5.large", "region": "us-east-1"},
+        {"id": "b", "platform": "aws", "type": "m5.large", "region": "eu-west-1"},
+        # Unknown region falls back to the platform's default region
+        {"id": "c", "platform": "aws", "type": "m5.large", "region": "ap-south-9"},
+    ]
+
+    recommendations = catalog.recommend("u", resources)
+
+    assert [(r["resource_id"], r["estimated_savings"], r["estimated_savings_percentage"]) for r in recommendations] == [
+        ("a", 7.5, 75.0), ("b", 16.0, 80.0), ("c", 7.5, 75.0),
+    ]
+    assert recommendations[0]["rule_id"] == "aws-downsize"
+    assert recommendations[0]["region"] == "us-east-1"
+
+
+def test_resources_without_a_positive_saving_are_skipped(catalog):
+    resources = [
+        {"id": "gcp", "platform": "gcp", "type": "e2-medium", "zone": "us-central1-a"},
+        {"id": "no-rule", "platform": "aws", "type": "t3.micro", "region": "us-east-1"},
+    ]
+
+    assert catalog.recommend("u", resources) == []
+    assert catalog.recommend("u", []) == []
+
+
+def test_version_follows_the_catalog_content():
+    changed = {**CATALOG, "skus": [dict(CATALOG["skus"][0], hourly=0.11)] + CATALOG["skus"][1:]}
+
+    assert PricingCatalog(CATALOG).version == PricingCatalog(dict(CATALOG)).version
+    assert PricingCatalog(changed).version != PricingCatalog(CATALOG).version
+
+
+def test_bundled_catalog_loads():
+    assert get_pricing_catalog().recommend("u", []) == []
+
+
+@pytest.mark.anyio
+async def test_cost_scan_stores_recommendations_and_resolves_dropped_ones(api, db):
+    await db.resources.insert_many([
+        {"user_id": "u", "id": "vm-1", "platform": "azure", "type": "Standard_B2s", "region": "eastus"},
+        {"user_id": "u", "id": "vm-2", "platform": "azure", "type": "Standard_B2s", "region": "eastus"},
+    ])
+
+    await api.scan_cost_optimizations("u", "scan-1")
+    assert await db.cost_recommendations.count_documents({"user_id": "u", "status": "open"}) == 2
+
+    await db.resources.update_one({"id": "vm-2"}, {"$set": {"stale": True}})
+    await api.scan_cost_optimizations("u", "scan-2", full=True)
+    statuses = {doc["resource_id"]: doc["status"] async for doc in db.cost_recommendations.find()}
+    assert statuses == {"vm-1": "open", "vm-2": "resolved"}
@@ -0,0 +1,48 @@
+import asyncio
+import json
+
+from app.progress import ScanProgress
+
+
+def test_queued_scan_reports_its_state(client, auth_headers):
+    scan_id = client.post("/api/resources/scan", headers=auth_headers).json()["scan_id"]
+
+    data = client.get(f"/api/scans/{scan_id}", headers=auth_headers).json()["data"]
+
+    assert (data["scan_id"], data["kind"], data["state"]) == (scan_id, "resources", "queued")
+    assert (data["resources_processed"], data["elapsed_ms"], data["throughput_per_sec"]) == (0, 0, 0.0)
+
+
+def test_progress_is_persisted_per_batch(client, db, auth_headers):
+    scan_id = client.post("/api/security/scan", headers=auth_headers).json()["scan_id"]
+
+    async def run_batches():
+        progress = ScanProgress(db, scan_id, "security")
+        await progress.start()
+        await progress.advance(500, 12)
+        await progress.advance(250, 3)
+        await db.scan_jobs.update_one({"_id": scan_id}, {"$set": {"status": "completed", "finished_at": progress.started_at}})
+
+    asyncio.run(run_batches())
+    data = client.get(f"/api/scans/{scan_id}", headers=auth_headers).json()["data"]
+
+    assert (data["state"], data["resources_processed"], data["findings"]) == ("completed", 750, 15)
+    assert data["started_at"] is not None
+
+
+def test_finished_scan_streams_its_status_and_ends(client, db, auth_headers):
+    scan_id = client.post("/api/costs/scan", headers=auth_headers).json()["scan_id"]
+    asyncio.run(db.scan_jobs.update_one({"_id": scan_id}, {"$set": {"status": "failed", "error": "boom"}}))
+
+    response = client.get(f"/api/scans/{scan_id}/events", headers=auth_headers)
+
+    lines = response.text.splitlines()
+    assert [line for line in lines if line.startswith("event: ")] == ["event: progress", "event: end"]
+    data = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data: ")]
+    assert [event["error"] for event in data] == ["boom", "boom"]
+
+
+def test_other_tenants_scans_are_not_found(client, db, auth_headers):
+    asyncio.run(db.scan_jobs.insert_one({"_id": "someone-else", "user_id": "other", "kind": "resources"}))
+
+    assert client.get("/api/scans/someone-else", headers=auth_headers).status_code == 404
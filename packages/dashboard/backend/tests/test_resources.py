@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import serialization
+
+
+@pytest.fixture
+def resources(db, user_id):
+    documents = [
+        {
+            "id": f"i-{i}", "type": "t3.micro", "platform": "aws", "user_id": user_id,
+            "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+        }
+        for i in range(7)
+    ]
+    asyncio.run(db.resources.insert_many(documents))
+    return documents
+
+
+def test_default_list_streams_every_resource(client, auth_headers, resources, monkeypatch):
+    monkeypatch.setattr(serialization, "STREAM_CHUNK_ROWS", 3)
+
+    response = client.get("/api/resources", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["status"] == "success"
+    assert body["results"] == 7
+    assert body["next_cursor"] is None
+    assert [row["id"] for row in body["data"]] == [str(doc["_id"]) for doc in resources]
+
+
+def test_empty_default_list(client, auth_headers):
+    assert client.get("/api/resources", headers=auth_headers).json() == {
+        "status": "success", "data": [], "results": 0, "next_cursor": None
+    }
+
+
+def test_limit_pages_through_resources(client, auth_headers, resources):
+    first = client.get("/api/resources?limit=4", headers=auth_headers).json()
+    second = client.get(f"/api/resources?after={first['next_cursor']}", headers=auth_headers).json()
+
+    assert (first["results"], second["results"]) == (4, 3)
+    assert second["next_cursor"] is None
+    assert [row["id"] for row in first["data"] + second["data"]] == [str(doc["_id"]) for doc in resources]
+
+
+def test_default_findings_list_is_streamed(client, db, auth_headers, user_id):
+    asyncio.run(db.security_issues.insert_many([
+        {"user_id": user_id, "resource_id": f"r{i}", "resource_type": "EC2", "platform": "aws",
+         "severity": "high", "status": "open", "issue": "x", "remediation": "y"}
+        for i in range(3)
+    ]))
+
+    body = client.get("/api/security/issues?severity=high,low", headers=auth_headers).json()
+
+    assert body["results"] == 3
+    assert len(body["data"]) == 3
+
+
+def test_response_cache_skips_bodies_over_the_cap(api, client, auth_headers, resources, monkeypatch):
+    from app.caching import MemoryResponseCache
+
+    monkeypatch.setattr(api, "response_cache", MemoryResponseCache())
+    client.get("/api/resources?limit=1", headers=auth_headers)
+    assert api.response_cache.stats()["size"] == 1
+
+    monkeypatch.setattr(api, "RESPONSE_CACHE_MAX_BYTES", 100)
+    response = client.get("/api/resources", headers=auth_headers)
+    assert response.json()["results"] == 7
+    assert api.response_cache.stats()["size"] == 1
@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+
+from app.findings import get_watermark, set_watermark
+from app.rules import RuleRegistry, SecurityRule, evaluate_in_batches
+
+NOW = datetime(2024, 1, 1)
+
+
+def rule(rule_id, **fields):
+    defaults = {
+        "platform": "aws", "resource_label": "EC2 Instance", "severity": "high",
+        "issue": f"{rule_id} issue", "remediation": f"Fix {rule_id}",
+    }
+    return SecurityRule(rule_id, **{**defaults, **fields})
+
+
+@pytest.fixture
+def registry():
+    registry = RuleRegistry()
+    registry.register(rule("micro-only", resource_types=["t3.micro"]))
+    registry.register(rule("every-aws"))
+    registry.register(rule("untagged", check=lambda resource: not resource.get("tags")))
+    registry.register(rule("azure-only", platform="azure"))
+    return registry
+
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def __aiter__(self):
+        for document in self.documents:
+            yield document
+
+
+def test_rules_are_matched_by_platform_and_type(registry):
+    assert [r.rule_id for r in registry.rules_for("aws", "t3.micro")] == ["micro-only", "every-aws", "untagged"]
+    assert [r.rule_id for r in registry.rules_for("aws", "m5.large")] == ["every-aws", "untagged"]
+    assert registry.rules_for("gcp", "e2-small") == []
+
+
+def test_evaluate_applies_checks_and_builds_findings(registry):
+    findings = registry.evaluate("u", {"id": "i-1", "platform": "aws", "type": "t3.micro", "tags": {"a": "b"}}, NOW)
+
+    assert [f["rule_id"] for f in findings] == ["micro-only", "every-aws"]
+    assert findings[0] == {
+        "user_id": "u", "rule_id": "micro-only", "resource_id": "i-1", "resource_type": "EC2 Instance",
+        "platform": "aws", "severity": "high", "severity_rank": 3, "issue": "micro-only issue",
+        "remediation": "Fix micro-only", "compliance": [], "status": "open", "created_at": NOW,
+    }
+
+
+def test_registering_a_rule_refreshes_the_lookup(registry):
+    registry.rules_for("aws", "m5.large")
+    registry.register(rule("late", resource_types=["m5.large"]))
+
+    assert "late" in [r.rule_id for r in registry.rules_for("aws", "m5.large")]
+
+
+@pytest.mark.anyio
+async def test_batches_report_stale_resources_without_findings(registry):
+    resources = [
+        {"id": f"i-{i}", "platform": "aws", "type": "m5.large", "tags": {"a": "b"}, "stale": i == 1}
+        for i in range(5)
+    ]
+
+    batches = [batch async for batch in evaluate_in_batches(Cursor(resources), "u", 2, registry)]
+
+    assert [evaluated for _, evaluated in batches] == [["i-0", "i-1"], ["i-2", "i-3"], ["i-4"]]
+    assert [[f["resource_id"] for f in findings] for findings, _ in batches] == [["i-0"], ["i-2", "i-3"], ["i-4"]]
+
+
+def registry_of(*rules):
+    registry = RuleRegistry()
+    for r in rules:
+        registry.register(r)
+    return registry
+
+
+def test_version_covers_the_whole_rule_definition():
+    base = registry_of(rule("a"), rule("b")).version()
+
+    assert registry_of(rule("b"), rule("a")).version() == base
+    assert registry_of(rule("a", remediation="Do it differently"), rule("b")).version() != base
+    assert registry_of(rule("a", compliance=["CIS 1.1"]), rule("b")).version() != base
+    assert registry_of(rule("a", resource_label="Instance"), rule("b")).version() != base
+
+
+@pytest.mark.anyio
+async def test_changed_rules_force_a_full_scan(db):
+    before = registry_of(rule("a")).version()
+    await set_watermark(db, "user-1", "security", before, NOW)
+
+    assert await get_watermark(db, "user-1", "security", before) == NOW
+    assert await get_watermark(db, "user-1", "security", registry_of(rule("a", remediation="New")).version()) is None
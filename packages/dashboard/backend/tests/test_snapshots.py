@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import pytest
+
+from app.caching import get_data_version
+from app.jobs import claim_periodic_run
+from app.snapshots import get_snapshots, take_snapshot
+
+USER = "user-1"
+
+
+async def add_issue(db, severity="high"):
+    await db.security_issues.insert_one({"user_id": USER, "severity": severity, "status": "open"})
+
+
+@pytest.mark.anyio
+async def test_snapshot_rolls_up_open_findings(db):
+    await add_issue(db)
+    await add_issue(db, "low")
+
+    await take_snapshot(db, USER)
+
+    (snapshot,) = await get_snapshots(db, USER, 1)
+    assert snapshot["security"] == {"open": 2, "by_severity": {"high": 1, "low": 1}}
+
+
+@pytest.mark.anyio
+async def test_unchanged_snapshot_keeps_the_data_version(db):
+    await add_issue(db)
+    await take_snapshot(db, USER)
+    version = await get_data_version(db, USER)
+
+    await take_snapshot(db, USER)
+    assert await get_data_version(db, USER) == version
+
+    await add_issue(db)
+    await take_snapshot(db, USER)
+    assert await get_data_version(db, USER) == version + 1
+
+
+@pytest.mark.anyio
+async def test_periodic_run_is_claimed_once_per_interval(db):
+    assert await claim_periodic_run(db, "snapshots", "worker-a", 3600)
+    assert not await claim_periodic_run(db, "snapshots", "worker-b", 3600)
+    assert not await claim_periodic_run(db, "snapshots", "worker-a", 3600)
+
+    await db.periodic_runs.update_one({"_id": "snapshots"}, {"$set": {"next_run_at": datetime.utcnow()}})
+    assert await claim_periodic_run(db, "snapshots", "worker-b", 3600)
+    assert (await db.periodic_runs.find_one({"_id": "snapshots"}))["owner"] == "worker-b"
@@ -0,0 +1,64 @@
+import pytest
+
+from app import summary
+from app.summary import apply_summary_delta, get_summary, recompute_summary, security_deltas
+
+USER = "user-1"
+
+
+async def add_issues(db, *severities):
+    await db.security_issues.insert_many([
+        {"user_id": USER, "resource_id": f"r{i}", "severity": severity, "status": "open"}
+        for i, severity in enumerate(severities)
+    ])
+
+
+@pytest.mark.anyio
+async def test_summary_is_built_on_first_read(db):
+    await add_issues(db, "high", "high", "low")
+
+    result = await get_summary(db, USER)
+
+    assert result["security"] == {"total": 3, "by_severity": {"high": 2, "low": 1}}
+    assert await db.dashboard_summaries.count_documents({"_id": USER}) == 1
+
+
+@pytest.mark.anyio
+async def test_delta_never_creates_a_summary(db):
+    await apply_summary_delta(db, USER, security_deltas([{"severity": "high"}]))
+
+    assert await db.dashboard_summaries.count_documents({}) == 0
+
+
+@pytest.mark.anyio
+async def test_deltas_update_an_existing_summary(db):
+    await add_issues(db, "high", "low")
+    await get_summary(db, USER)
+
+    await apply_summary_delta(db, USER, security_deltas([{"severity": "low"}], sign=-1))
+
+    result = await get_summary(db, USER)
+    assert result["security"] == {"total": 1, "by_severity": {"high": 1}}
+
+
+@pytest.mark.anyio
+async def test_recompute_keeps_a_delta_that_lands_while_aggregating(db, monkeypatch):
+    await add_issues(db, "high", "high")
+    await get_summary(db, USER)
+    aggregate = summary._aggregate_summary
+    calls = []
+
+    async def racing_aggregate(db, user_id):
+        result = await aggregate(db, user_id)
+        if not calls:
+            # A remediation commits after the aggregation read the issues
+            await db.security_issues.update_one({"resource_id": "r0"}, {"$set": {"status": "remediated"}})
+            await apply_summary_delta(db, user_id, security_deltas([{"severity": "high"}], sign=-1))
+        calls.append(result)
+        return result
+
+    monkeypatch.setattr(summary, "_aggregate_summary", racing_aggregate)
+    await recompute_summary(db, USER)
+
+    assert len(calls) == 2
+    assert (await get_summary(db, USER))["security"]["total"] == 1
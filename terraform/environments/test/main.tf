@@ -116,5 +116,6 @@ module "ecs" {
   frontend_cpu          = 256
   frontend_memory       = 512
   api_instance_count    = 1
+  worker_instance_count = 1
   frontend_instance_count = 1
 }
\ No newline at end of file
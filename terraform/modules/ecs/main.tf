@@ -142,6 +142,25 @@ resource "aws_security_group" "frontend" {
   }
 }
 
+# The scan worker only makes outbound connections (DocumentDB, cloud APIs)
+resource "aws_security_group" "worker" {
+  name        = "${var.project_name}-${var.environment}-worker-sg"
+  description = "Security group for the scan worker service"
+  vpc_id      = var.vpc_id
+  
+  egress {
+    from_port   = 0
+    to_port     = 0
+    protocol    = "-1"
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+  
+  tags = {
+    Name        = "${var.project_name}-worker-sg"
+    Environment = var.environment
+  }
+}
+
 # CloudWatch log groups
 resource "aws_cloudwatch_log_group" "api" {
   name              = "/ecs/${var.project_name}-${var.environment}-api"
@@ -153,6 +172,16 @@ resource "aws_cloudwatch_log_group" "api" {
   }
 }
 
+resource "aws_cloudwatch_log_group" "worker" {
+  name              = "/ecs/${var.project_name}-${var.environment}-worker"
+  retention_in_days = 14
+  
+  tags = {
+    Name        = "${var.project_name}-worker-logs"
+    Environment = var.environment
+  }
+}
+
 resource "aws_cloudwatch_log_group" "frontend" {
   name              = "/ecs/${var.project_name}-${var.environment}-frontend"
   retention_in_days = 14
@@ -343,6 +372,54 @@ resource "aws_ecs_task_definition" "api" {
   ])
 }
 
+# Scan worker: same image as the API, running the queued scans (python -m app.worker)
+resource "aws_ecs_task_definition" "worker" {
+  family                   = "${var.project_name}-${var.environment}-worker"
+  network_mode             = "awsvpc"
+  requires_compatibilities = ["FARGATE"]
+  cpu                      = var.worker_cpu
+  memory                   = var.worker_memory
+  execution_role_arn       = aws_iam_role.ecs_execution_role.arn
+  task_role_arn            = aws_iam_role.ecs_task_role.arn
+  
+  container_definitions = jsonencode([
+    {
+      name      = "worker"
+      image     = var.api_image
+      essential = true
+      command   = ["python", "-m", "app.worker"]
+      
+      # On SIGTERM the worker stops leasing jobs and lets running scans finish;
+      # anything still running after this is re-leased by another worker
+      stopTimeout = 120
+      
+      environment = [
+        {
+          name  = "DATABASE_URL"
+          value = var.db_connection_string
+        },
+        {
+          name  = "WORKER_CONCURRENCY"
+          value = tostring(var.worker_concurrency)
+        },
+        {
+          name  = "NODE_ENV"
+          value = var.environment
+        }
+      ]
+      
+      logConfiguration = {
+        logDriver = "awslogs"
+        options = {
+          "awslogs-group"         = aws_cloudwatch_log_group.worker.name
+          "awslogs-region"        = var.aws_region
+          "awslogs-stream-prefix" = "ecs"
+        }
+      }
+    }
+  ])
+}
+
 resource "aws_ecs_task_definition" "frontend" {
   family                   = "${var.project_name}-${var.environment}-frontend"
   network_mode             = "awsvpc"
@@ -420,6 +497,25 @@ resource "aws_ecs_service" "api" {
   }
 }
 
+resource "aws_ecs_service" "worker" {
+  name            = "${var.project_name}-${var.environment}-worker"
+  cluster         = aws_ecs_cluster.main.id
+  task_definition = aws_ecs_task_definition.worker.arn
+  desired_count   = var.worker_instance_count
+  launch_type     = "FARGATE"
+  
+  network_configuration {
+    subnets          = var.private_subnet_ids
+    security_groups  = [aws_security_group.worker.id]
+    assign_public_ip = false
+  }
+
+  tags = {
+    Name        = "${var.project_name}-worker-service"
+    Environment = var.environment
+  }
+}
+
 resource "aws_ecs_service" "frontend" {
   name            = "${var.project_name}-${var.environment}-frontend"
   cluster         = aws_ecs_cluster.main.id
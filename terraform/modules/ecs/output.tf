@@ -8,6 +8,11 @@ output "backend_service_name" {
   value       = aws_ecs_service.api.name
 }
 
+output "worker_service_name" {
+  description = "The name of the scan worker ECS service"
+  value       = aws_ecs_service.worker.name
+}
+
 output "frontend_service_name" {
   description = "The name of the frontend ECS service"
   value       = aws_ecs_service.frontend.name
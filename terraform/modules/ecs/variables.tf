@@ -87,6 +87,30 @@ variable "api_instance_count" {
   default     = 1
 }
 
+variable "worker_cpu" {
+  description = "The CPU units for the scan worker task"
+  type        = number
+  default     = 256
+}
+
+variable "worker_memory" {
+  description = "The memory for the scan worker task in MiB"
+  type        = number
+  default     = 512
+}
+
+variable "worker_instance_count" {
+  description = "The number of scan worker instances to run"
+  type        = number
+  default     = 1
+}
+
+variable "worker_concurrency" {
+  description = "The number of scans each worker runs concurrently"
+  type        = number
+  default     = 4
+}
+
 variable "frontend_instance_count" {
   description = "The number of frontend instances to run"
   type        = number